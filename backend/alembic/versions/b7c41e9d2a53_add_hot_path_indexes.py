@@ -0,0 +1,53 @@
+"""Add hot-path indexes
+
+Revision ID: b7c41e9d2a53
+Revises: 42d030548738
+Create Date: 2026-10-19 09:12:44.301522
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7c41e9d2a53'
+down_revision: Union[str, None] = '42d030548738'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, columns, partial-index predicate)
+INDEXES = [
+    ('ix_battles_challenger_status', 'battles', ['challenger_id', 'battle_status'], None),
+    ('ix_battles_opponent_status', 'battles', ['opponent_id', 'battle_status'], None),
+    ('ix_battles_pending_opponent', 'battles', ['opponent_id'], "battle_status = 'pending'"),
+    ('ix_battle_responses_battle_user', 'battle_responses', ['battle_id', 'user_id'], None),
+    ('ix_battle_responses_user', 'battle_responses', ['user_id'], None),
+    ('ix_questions_folder_difficulty_type', 'questions', ['class_folder_id', 'difficulty_level', 'question_type'], None),
+    ('ix_temp_notes_class_folder', 'temp_notes', ['class_folder_id'], None),
+    ('ix_temp_notes_expires_at', 'temp_notes', ['expires_at'], None),
+    ('ix_class_folders_public_created', 'class_folders', ['created_at', 'id'], 'is_public'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY can't run inside a transaction, but avoids locking live tables
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name, table, columns,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+                sqlite_where=sa.text(where) if where else None,
+                if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
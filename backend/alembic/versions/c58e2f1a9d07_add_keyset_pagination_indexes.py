@@ -0,0 +1,41 @@
+"""Add keyset pagination indexes
+
+Revision ID: c58e2f1a9d07
+Revises: b7c41e9d2a53
+Create Date: 2026-10-19 11:40:02.118734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c58e2f1a9d07'
+down_revision: Union[str, None] = 'b7c41e9d2a53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, columns) - each listing filters on the leading column
+# and pages newest-first on (created_at, id)
+INDEXES = [
+    ('ix_battles_challenger_created', 'battles', ['challenger_id', 'created_at', 'id']),
+    ('ix_battles_opponent_created', 'battles', ['opponent_id', 'created_at', 'id']),
+    ('ix_class_folders_owner_created', 'class_folders', ['owner_id', 'created_at', 'id']),
+    ('ix_questions_folder_created', 'questions', ['class_folder_id', 'created_at', 'id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,45 @@
+"""Add folder search index
+
+Revision ID: d91b3c7e4f28
+Revises: c58e2f1a9d07
+Create Date: 2026-10-19 14:05:51.630917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# Must match models.education.FOLDER_SEARCH_DOCUMENT
+FOLDER_SEARCH_DOCUMENT = (
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(course_code, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(university_name, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd91b3c7e4f28'
+down_revision: Union[str, None] = 'c58e2f1a9d07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_class_folders_search', 'class_folders',
+            [sa.text(f"({FOLDER_SEARCH_DOCUMENT})")],
+            postgresql_using='gin',
+            postgresql_where=sa.text('is_public'),
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_class_folders_search', table_name='class_folders', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,40 @@
+"""Add extraction_cache table
+
+Revision ID: e5b8c2d4a613
+Revises: d91b3c7e4f28
+Create Date: 2026-10-19 16:22:37.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b8c2d4a613'
+down_revision: Union[str, None] = 'd91b3c7e4f28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('extraction_cache',
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('content_type', sa.String(length=100), nullable=False),
+        sa.Column('extractor_version', sa.Integer(), nullable=False),
+        sa.Column('source_size', sa.Integer(), nullable=True),
+        sa.Column('text_size', sa.Integer(), nullable=False),
+        sa.Column('hits', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('last_used_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('sha256')
+    )
+    op.create_index('ix_extraction_cache_last_used', 'extraction_cache', ['last_used_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_extraction_cache_last_used', table_name='extraction_cache')
+    op.drop_table('extraction_cache')
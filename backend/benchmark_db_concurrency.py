@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark request throughput against the configured DATABASE_URL with the
+sync Session run on the event loop versus the native AsyncSession.
+
+Usage: python benchmark_db_concurrency.py [requests_per_level]
+"""
+
+import sys
+import os
+import time
+import asyncio
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from database import SessionLocal, AsyncSessionLocal, DATABASE_URL
+
+CONCURRENCY_LEVELS = [1, 4, 16, 64]
+# Simulated per-query server time on Postgres, standing in for a real round trip
+LATENCY_SECONDS = float(os.getenv('DB_BENCH_LATENCY_MS', '5')) / 1000
+
+def benchmark_query():
+    if DATABASE_URL.startswith('postgresql'):
+        return text("SELECT pg_sleep(:seconds)").bindparams(seconds=LATENCY_SECONDS)
+    return text("SELECT 1")
+
+async def sync_request():
+    # What the routes did before: a blocking query straight on the event loop
+    db = SessionLocal()
+    try:
+        db.execute(benchmark_query())
+    finally:
+        db.close()
+
+async def async_request():
+    async with AsyncSessionLocal() as db:
+        await db.execute(benchmark_query())
+
+async def run_level(request, concurrency: int, total_requests: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited():
+        async with semaphore:
+            await request()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(limited() for _ in range(total_requests)))
+    return total_requests / (time.perf_counter() - start)
+
+async def run_benchmark(total_requests: int):
+    print("🏁 Database concurrency benchmark")
+    print("=" * 50)
+    print(f"Database: {DATABASE_URL.split('@')[-1]}")
+    print(f"{total_requests} requests per level\n")
+    print(f"  {'clients':>8} {'sync req/s':>12} {'async req/s':>12} {'speedup':>9}")
+
+    # Warm both pools so connection setup isn't measured
+    await run_level(sync_request, 4, 8)
+    await run_level(async_request, 4, 8)
+
+    for concurrency in CONCURRENCY_LEVELS:
+        sync_rate = await run_level(sync_request, concurrency, total_requests)
+        async_rate = await run_level(async_request, concurrency, total_requests)
+        print(f"  {concurrency:>8} {sync_rate:>12.1f} {async_rate:>12.1f} {async_rate / sync_rate:>8.2f}x")
+
+if __name__ == "__main__":
+    requests_per_level = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    asyncio.run(run_benchmark(requests_per_level))
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark saving generated questions against the configured DATABASE_URL:
+the old add/flush per question path versus the bulk insert path.
+Everything runs inside transactions that are rolled back.
+"""
+
+import sys
+import os
+import time
+import uuid
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event
+from database import SessionLocal, engine, DATABASE_URL
+from models import User, ClassFolder, Question, QuestionOption
+from services.notes_services import build_question_options, build_question_rows, insert_question_rows
+
+QUESTION_COUNTS = [10, 100, 1000]
+QUESTION_TYPES = ["multiple_choice", "true_false", "short_answer"]
+
+def fake_generated_questions(count: int) -> list:
+    """Question dicts shaped like QuestionGenerator output, mixing all types"""
+    questions = []
+    for i in range(count):
+        question_type = QUESTION_TYPES[i % len(QUESTION_TYPES)]
+        q_data = {
+            "question": f"Benchmark question {i}?",
+            "type": question_type,
+            "topic": "Benchmarks",
+            "explanation": "Because it is measured.",
+            "points": 10,
+            "correct_answer": "Option 1"
+        }
+        if question_type == "multiple_choice":
+            q_data["options"] = ["Option 1", "Option 2", "Option 3", "Option 4"]
+        elif question_type == "true_false":
+            q_data["correct_answer"] = "True"
+        questions.append(q_data)
+    return questions
+
+def save_per_row(db, folder_id, generated_questions):
+    # What generate_questions did before: one flush per question for its id
+    for q_data in generated_questions:
+        question = Question(
+            class_folder_id=folder_id,
+            question_text=q_data["question"],
+            question_type=q_data["type"],
+            difficulty_level="medium",
+            topic=q_data.get("topic"),
+            correct_answer=q_data["correct_answer"],
+            explanation=q_data.get("explanation"),
+            points_value=q_data.get("points", 10)
+        )
+        db.add(question)
+        db.flush()
+        for option_letter, option_text, is_correct in build_question_options(q_data):
+            db.add(QuestionOption(
+                question_id=question.id,
+                option_letter=option_letter,
+                option_text=option_text,
+                is_correct=is_correct
+            ))
+    db.flush()
+
+def save_bulk(db, folder_id, generated_questions):
+    question_rows, option_rows = build_question_rows(folder_id, generated_questions, "medium")
+    insert_question_rows(db, question_rows, option_rows)
+
+def measure(save, generated_questions, statements: list) -> tuple:
+    db = SessionLocal()
+    try:
+        user = User(username=f"bench_{uuid.uuid4().hex[:8]}", email=f"{uuid.uuid4().hex[:8]}@bench.local", password_hash="x")
+        db.add(user)
+        db.flush()
+        folder = ClassFolder(owner_id=user.id, name="Benchmark folder")
+        db.add(folder)
+        db.flush()
+        statements.clear()
+        start = time.perf_counter()
+        save(db, folder.id, generated_questions)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        return elapsed_ms, len(statements)
+    finally:
+        db.rollback()
+        db.close()
+
+def run_benchmark():
+    print("🏁 Question insert benchmark")
+    print("=" * 50)
+    print(f"Database: {DATABASE_URL.split('@')[-1]}\n")
+    print(f"  {'questions':>9} {'per-row ms':>11} {'stmts':>6} {'bulk ms':>9} {'stmts':>6} {'speedup':>8}")
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count_statement)
+    # Warm up connections and statement caches
+    measure(save_per_row, fake_generated_questions(3), statements)
+    measure(save_bulk, fake_generated_questions(3), statements)
+
+    for count in QUESTION_COUNTS:
+        generated_questions = fake_generated_questions(count)
+        per_row_ms, per_row_statements = measure(save_per_row, generated_questions, statements)
+        bulk_ms, bulk_statements = measure(save_bulk, generated_questions, statements)
+        print(f"  {count:>9} {per_row_ms:>11.1f} {per_row_statements:>6} {bulk_ms:>9.1f} {bulk_statements:>6} {per_row_ms / bulk_ms:>7.1f}x")
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark the WebSocket wire protocols: bytes per battle and CPU per message
+for the JSON path (json.dumps) against the msgpack binary protocol.
+"""
+
+import sys
+import os
+import time
+import json
+import uuid
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.ws_codec import encode_binary, is_binary_available
+
+QUESTIONS_PER_BATTLE = 10
+ENCODE_ROUNDS = 2000
+
+def build_battle_messages(total_questions: int = QUESTIONS_PER_BATTLE) -> list:
+    """Messages ConnectionManager sends over one battle, across both players"""
+    battle_id = str(uuid.uuid4())
+    challenger_id = str(uuid.uuid4())
+    opponent_id = str(uuid.uuid4())
+    battle = {
+        "id": battle_id,
+        "challenger_id": challenger_id,
+        "opponent_id": opponent_id,
+        "class_folder_id": str(uuid.uuid4()),
+        "battle_status": "active",
+        "total_questions": total_questions,
+        "time_limit_seconds": 30,
+        "challenger_score": 0,
+        "opponent_score": 0,
+        "room_code": "AB12CD",
+        "is_public": True,
+        "created_at": "2025-06-28T10:23:35.528644+00:00",
+        "started_at": "2025-06-28T10:24:01.102934+00:00",
+        "completed_at": None
+    }
+    messages = [
+        {"type": "BATTLE_ACCEPTED", "battle": battle, "seq": 1},
+        {"type": "BATTLE_STARTED", "battle": battle, "seq": 1},
+    ]
+    for index in range(total_questions):
+        question_id = str(uuid.uuid4())
+        for seq in range(2):
+            messages.append({
+                "type": "opponent_answered",
+                "battle_id": battle_id,
+                "question_id": question_id,
+                "is_correct": index % 2 == 0,
+                "points_earned": 14,
+                "both_answered": seq == 1,
+                "seq": index * 2 + seq + 2
+            })
+        for _ in range(2):
+            messages.append({
+                "type": "question_completed",
+                "battle_id": battle_id,
+                "question_id": question_id,
+                "next_question_ready": True,
+                "seq": index * 2 + 3
+            })
+    player_stats = {"score": 120, "correct_answers": 7, "total_answers": total_questions, "average_time": 11.4}
+    for _ in range(2):
+        messages.append({
+            "type": "battle_completed",
+            "battle_id": battle_id,
+            "challenger": player_stats,
+            "opponent": player_stats,
+            "winner_id": challenger_id,
+            "winner_reason": "higher_score",
+            "completed_at": "2025-06-28T10:30:12.938211+00:00",
+            "seq": total_questions * 2 + 4
+        })
+    return messages
+
+def measure(name: str, encode, messages: list):
+    total_bytes = sum(len(encode(message)) for message in messages)
+    start = time.perf_counter()
+    for _ in range(ENCODE_ROUNDS):
+        for message in messages:
+            encode(message)
+    elapsed = time.perf_counter() - start
+    per_message_us = elapsed / (ENCODE_ROUNDS * len(messages)) * 1_000_000
+    print(f"  {name:<10} {total_bytes:>8} bytes/battle   {per_message_us:>6.2f} µs/message")
+    return total_bytes
+
+def run_benchmark():
+    messages = build_battle_messages()
+    print("📦 WebSocket protocol benchmark")
+    print("=" * 50)
+    print(f"{len(messages)} messages per {QUESTIONS_PER_BATTLE}-question battle, {ENCODE_ROUNDS} rounds\n")
+
+    json_bytes = measure("json", lambda message: json.dumps(message).encode(), messages)
+    if not is_binary_available():
+        print("\n⚠️  msgpack not installed - skipping binary protocol")
+        return
+    binary_bytes = measure("msgpack", encode_binary, messages)
+    print(f"\n✅ Binary protocol is {binary_bytes / json_bytes * 100:.1f}% of JSON size")
+
+if __name__ == "__main__":
+    run_benchmark()
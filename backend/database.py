@@ -1,8 +1,17 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool, NullPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from decouple import config
+from collections import deque
+import logging
 import os
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
 
 # Get database URL from environment with fallback
 try:
@@ -12,8 +21,21 @@ except:
     DATABASE_URL = "sqlite:///./brainduel.db"
     print("⚠️  No DATABASE_URL found, using SQLite fallback")
 
+# A plain in-memory SQLite database is private to one connection. Tests and
+# load runs get a named shared-cache one instead, so every pooled connection,
+# sync and async, sees the same tables.
+SQLITE_SHARED_MEMORY_URL = "sqlite:///file:brainduel?mode=memory&cache=shared&uri=true"
+if DATABASE_URL in ("sqlite://", "sqlite:///:memory:"):
+    DATABASE_URL = SQLITE_SHARED_MEMORY_URL
+
+# SQLite tuning for local development and laptop load tests
+SQLITE_MMAP_SIZE = int(config('SQLITE_MMAP_SIZE', default=268435456))  # 256 MB
+SQLITE_BUSY_TIMEOUT_MS = int(config('SQLITE_BUSY_TIMEOUT_MS', default=5000))
+
+# Railway PostgreSQL requires SSL; local/test databases can set DATABASE_SSLMODE=disable
+DATABASE_SSLMODE = config('DATABASE_SSLMODE', default='require')
+
 # Set other required environment variables with fallbacks
-import os
 if not os.getenv('SECRET_KEY'):
     os.environ['SECRET_KEY'] = 'your-secret-key-here-for-development'
 if not os.getenv('ALGORITHM'):
@@ -21,22 +43,175 @@ if not os.getenv('ALGORITHM'):
 if not os.getenv('ACCESS_TOKEN_EXPIRE_MINUTES'):
     os.environ['ACCESS_TOKEN_EXPIRE_MINUTES'] = '30'
 
+# Connection pool sizing, per engine and per process
+DB_POOL_SIZE = int(config('DB_POOL_SIZE', default=10))
+DB_MAX_OVERFLOW = int(config('DB_MAX_OVERFLOW', default=20))
+DB_POOL_TIMEOUT = int(config('DB_POOL_TIMEOUT', default=30))
+DB_POOL_RECYCLE = int(config('DB_POOL_RECYCLE', default=300))
+# Pre-ping costs a round trip per checkout; without it, DB_POOL_RECYCLE alone
+# retires connections before the server or a proxy drops them
+DB_POOL_PRE_PING = config('DB_POOL_PRE_PING', default=True, cast=bool)
+# PgBouncer in transaction mode hands each transaction a different server
+# connection, so named prepared statements can't be cached or reused
+DB_PGBOUNCER_MODE = config('DB_PGBOUNCER_MODE', default=False, cast=bool)
+
+class PoolMetrics:
+    """Checkout wait and pre-ping timings for one engine's connection pool"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.max_wait_ms = 0.0
+        self.recent_waits_ms = deque(maxlen=1000)
+        self.pings = 0
+        self.ping_failures = 0
+        self.total_ping_ms = 0.0
+        self.recent_pings_ms = deque(maxlen=1000)
+        self.pool = None
+
+    def record_checkout(self, wait_ms: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.checkout_timeouts += 1
+            else:
+                self.checkouts += 1
+            self.recent_waits_ms.append(wait_ms)
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def record_ping(self, ping_ms: float, ok: bool):
+        with self._lock:
+            self.pings += 1
+            if not ok:
+                self.ping_failures += 1
+            self.total_ping_ms += ping_ms
+            self.recent_pings_ms.append(ping_ms)
+
+    def instrument_ping(self, dialect):
+        """Wrap the dialect's ping so pre-ping round trips are timed"""
+        do_ping = dialect.do_ping
+
+        def timed_ping(dbapi_connection):
+            start = time.perf_counter()
+            ok = False
+            try:
+                ok = do_ping(dbapi_connection)
+                return ok
+            finally:
+                self.record_ping((time.perf_counter() - start) * 1000, ok)
+
+        dialect.do_ping = timed_ping
+
+    def get_metrics(self) -> dict:
+        """Pool occupancy plus checkout wait and pre-ping percentiles"""
+        with self._lock:
+            waits = sorted(self.recent_waits_ms)
+            pings = sorted(self.recent_pings_ms)
+            metrics = {
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.checkout_timeouts,
+                "max_wait_ms": round(self.max_wait_ms, 2),
+                "pre_ping": {
+                    "enabled": DB_POOL_PRE_PING,
+                    "pings": self.pings,
+                    "failures": self.ping_failures,
+                    "total_ms": round(self.total_ping_ms, 2),
+                },
+            }
+        pool = self.pool
+        if isinstance(pool, QueuePool):
+            metrics.update({
+                "pool_size": pool.size(),
+                "in_use": pool.checkedout(),
+                "idle": pool.checkedin(),
+                # Negative while the pool is still below pool_size
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+            })
+        elif pool is not None:
+            metrics["pool"] = type(pool).__name__
+        if waits:
+            metrics["wait_ms_p50"] = round(waits[len(waits) // 2], 2)
+            metrics["wait_ms_p95"] = round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 2)
+        if pings:
+            metrics["pre_ping"]["ms_p50"] = round(pings[len(pings) // 2], 3)
+            metrics["pre_ping"]["ms_p95"] = round(pings[min(len(pings) - 1, int(len(pings) * 0.95))], 3)
+        return metrics
+
+def instrumented_pool_class(base, metrics: PoolMetrics):
+    """Pool subclass that times every checkout, including waiting on the queue"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = base._do_get(self)
+        except Exception:
+            metrics.record_checkout((time.perf_counter() - start) * 1000, timed_out=True)
+            raise
+        metrics.record_checkout((time.perf_counter() - start) * 1000)
+        return connection
+
+    return type(f"Instrumented{base.__name__}", (base,), {"_do_get": _do_get})
+
+def pool_options(base, metrics: PoolMetrics) -> dict:
+    """create_engine pool arguments for the configured pool settings"""
+    options = {
+        "poolclass": instrumented_pool_class(base, metrics),
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if base is not NullPool:
+        options.update({
+            "pool_recycle": DB_POOL_RECYCLE,
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+        })
+    return options
+
+def attach_pool_metrics(engine, metrics: PoolMetrics):
+    """Point metrics at the engine's pool and time its pre-pings"""
+    metrics.pool = engine.pool
+    metrics.instrument_ping(engine.dialect)
+
+pool_metrics = {}
+
 # Create SQLAlchemy engine with better configuration
+pool_metrics["primary_sync"] = PoolMetrics("primary_sync")
 engine = create_engine(
     DATABASE_URL,
-    pool_pre_ping=True,        # Check connection health before use
-    pool_recycle=300,          # Recycle connections every 5 minutes
-    pool_size=10,              # Number of connections to keep open
-    max_overflow=20,           # Number of connections to create during overflow
+    **pool_options(QueuePool, pool_metrics["primary_sync"]),
     echo=False,                # Set to True only for debugging
     connect_args={
         "keepalives": 1,       # Enable TCP keepalive
         "keepalives_idle": 30, # TCP idle time before keepalive probe
         "keepalives_interval": 10, # Time between keepalive probes
         "keepalives_count": 5, # Number of keepalive probes before dropping
-        "sslmode": "require"   # Require SSL for Railway PostgreSQL
-    } if DATABASE_URL.startswith('postgresql') else {}
+        "sslmode": DATABASE_SSLMODE   # Require SSL for Railway PostgreSQL
+    } if DATABASE_URL.startswith('postgresql') else {
+        "check_same_thread": False  # Pooled SQLite connections move between threads
+    }
 )
+attach_pool_metrics(engine, pool_metrics["primary_sync"])
+
+def configure_sqlite_connection(dbapi_connection, connection_record):
+    """Apply the SQLite profile to each new connection"""
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers run alongside the single writer; in-memory databases keep their own journal
+    cursor.execute("PRAGMA journal_mode=WAL")
+    # Safe under WAL: a crash can lose the last commits but never corrupts the file
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+if DATABASE_URL.startswith('sqlite'):
+    event.listen(engine, "connect", configure_sqlite_connection)
+    if DATABASE_URL == SQLITE_SHARED_MEMORY_URL:
+        # A shared in-memory database is dropped when its last connection
+        # closes, so hold one open for the life of the process
+        _sqlite_memory_anchor = engine.raw_connection()
 
 # Configure session factory with additional parameters
 SessionLocal = sessionmaker(
@@ -46,6 +221,77 @@ SessionLocal = sessionmaker(
     expire_on_commit=False  # Prevents premature expiration of instances
 )
 
+def get_async_database_url(url: str) -> str:
+    """Translate the sync DATABASE_URL into the same database behind an async driver"""
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    if url.startswith("postgresql+psycopg2://"):
+        url = "postgresql://" + url[len("postgresql+psycopg2://"):]
+    if url.startswith("postgresql://"):
+        return "postgresql+asyncpg://" + url[len("postgresql://"):]
+    if url.startswith("sqlite:///"):
+        return "sqlite+aiosqlite:///" + url[len("sqlite:///"):]
+    return url
+
+ASYNC_DATABASE_URL = get_async_database_url(DATABASE_URL)
+
+# Async engine used by the request handlers, so queries never block the event loop.
+# asyncpg doesn't take libpq's keepalive/sslmode options; ssl is its equivalent,
+# SQLite gets the same pool so concurrent requests don't share one connection.
+def create_async_engine_for(url: str, name: str):
+    """Create an async engine for url with the configured pool settings"""
+    metrics = pool_metrics[name] = PoolMetrics(name)
+    if url.startswith('postgresql'):
+        connect_args = {"ssl": DATABASE_SSLMODE}
+        if DB_PGBOUNCER_MODE:
+            connect_args.update({
+                "statement_cache_size": 0,           # asyncpg's own statement cache
+                "prepared_statement_cache_size": 0,  # SQLAlchemy's asyncpg cache
+                # Unique names so statements never collide on a shared server connection
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+            })
+        async_engine = create_async_engine(
+            url,
+            # PgBouncer already pools; holding connections here as well would let
+            # the uniquely named prepared statements pile up on the server
+            **pool_options(NullPool if DB_PGBOUNCER_MODE else AsyncAdaptedQueuePool, metrics),
+            echo=False,
+            connect_args=connect_args
+        )
+        attach_pool_metrics(async_engine.sync_engine, metrics)
+        return async_engine
+    async_engine = create_async_engine(url, **pool_options(AsyncAdaptedQueuePool, metrics), echo=False)
+    attach_pool_metrics(async_engine.sync_engine, metrics)
+    if url.startswith('sqlite'):
+        event.listen(async_engine.sync_engine, "connect", configure_sqlite_connection)
+    return async_engine
+
+async_engine = create_async_engine_for(ASYNC_DATABASE_URL, "primary")
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False  # Attributes stay loaded after commit; lazy loads can't run async
+)
+
+# Optional read replica for read-only endpoints; unset means reads use the primary
+DATABASE_READ_REPLICA_URL = config('DATABASE_READ_REPLICA_URL', default='')
+# How long to send reads to the primary after the replica fails to connect
+READ_REPLICA_RETRY_SECONDS = int(config('READ_REPLICA_RETRY_SECONDS', default=30))
+
+if DATABASE_READ_REPLICA_URL:
+    read_async_engine = create_async_engine_for(get_async_database_url(DATABASE_READ_REPLICA_URL), "replica")
+    ReadAsyncSessionLocal = async_sessionmaker(
+        bind=read_async_engine,
+        class_=AsyncSession,
+        autoflush=False,
+        expire_on_commit=False
+    )
+else:
+    read_async_engine = None
+    ReadAsyncSessionLocal = None
+
 # Create declarative base
 Base = declarative_base()
 
@@ -60,6 +306,45 @@ def get_db():
     finally:
         db.close()
 
+# Async dependency for routes running on the event loop
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except Exception as e:
+            await db.rollback()
+            raise e
+
+# Monotonic time until which the replica is skipped after a failed connect
+_replica_unavailable_until = 0.0
+
+async def _open_read_session() -> AsyncSession:
+    """Open a session on the replica, or on the primary if it's unset or down"""
+    global _replica_unavailable_until
+    if ReadAsyncSessionLocal is None or time.monotonic() < _replica_unavailable_until:
+        return AsyncSessionLocal()
+    db = ReadAsyncSessionLocal()
+    try:
+        # Check out the connection now so a dead replica fails before the handler runs
+        await db.connection()
+        return db
+    except Exception as e:
+        await db.close()
+        _replica_unavailable_until = time.monotonic() + READ_REPLICA_RETRY_SECONDS
+        logger.warning(f"Read replica unavailable, using primary for {READ_REPLICA_RETRY_SECONDS}s: {e}")
+        return AsyncSessionLocal()
+
+# Async dependency for read-only routes; replica reads may lag the primary slightly
+async def get_read_db():
+    db = await _open_read_session()
+    try:
+        yield db
+    except Exception as e:
+        await db.rollback()
+        raise e
+    finally:
+        await db.close()
+
 # Improved table creation with existence check
 def create_tables():
     try:
@@ -87,4 +372,8 @@ def check_db_connection():
         return True
     except Exception as e:
         print(f"Database connection failed: {e}")
-        return False
\ No newline at end of file
+        return False
+
+def get_pool_metrics() -> dict:
+    """Connection pool metrics for every engine, keyed by engine name"""
+    return {name: metrics.get_metrics() for name, metrics in pool_metrics.items()}
@@ -1,8 +1,13 @@
 import os
+import secrets
 import sys
+from typing import Optional
+from decouple import config
 from fastapi import FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import select, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Debug startup information
 print("🚀 Brain Duel Backend Starting...")
@@ -24,7 +29,7 @@ for var in env_vars:
         print(f"  {var}: NOT SET")
 
 try:
-    from database import get_db, create_tables
+    from database import get_async_db, create_tables
     print("✅ Database module imported successfully")
 except Exception as e:
     print(f"❌ Database module import failed: {e}")
@@ -63,8 +68,32 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # pagination cursor on list endpoints
 )
 
+@app.on_event("startup")
+async def start_background_tasks():
+    from services.note_reaper import note_reaper, NOTE_REAPER_ENABLED
+    from services.password_hashing import password_hasher
+    from services.extraction import extraction_service
+    from services.upload_jobs import upload_job_queue
+    if NOTE_REAPER_ENABLED:
+        note_reaper.start()
+    password_hasher.start()
+    extraction_service.start()
+    upload_job_queue.start()
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    from services.note_reaper import note_reaper
+    from services.password_hashing import password_hasher
+    from services.extraction import extraction_service
+    from services.upload_jobs import upload_job_queue
+    await upload_job_queue.stop()
+    await note_reaper.stop()
+    password_hasher.shutdown()
+    extraction_service.shutdown()
+
 # Health check endpoint
 @app.get("/")
 async def root():
@@ -75,10 +104,10 @@ async def health_check():
     return {"status": "healthy", "message": "Brain Duel API is operational"}
 
 @app.get("/health/db")
-async def health_check_db(db: Session = Depends(get_db)):
+async def health_check_db(db: AsyncSession = Depends(get_async_db)):
     try:
         # Test database connection
-        result = db.execute("SELECT 1")
+        result = await db.execute(text("SELECT 1"))
         return {
             "status": "healthy",
             "database": "connected",
@@ -87,6 +116,46 @@ async def health_check_db(db: Session = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"Database connection failed: {str(e)}")
 
+# Internal metrics stay off unless a token is set; scrapers send it as a bearer token
+HEALTH_METRICS_TOKEN = config('HEALTH_METRICS_TOKEN', default='')
+
+def require_metrics_token(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False))
+):
+    if not HEALTH_METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if credentials is None or not secrets.compare_digest(credentials.credentials, HEALTH_METRICS_TOKEN):
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+@app.get("/health/metrics", dependencies=[Depends(require_metrics_token)])
+async def health_metrics():
+    from services import manager
+    from services.blocking import blocking_executor
+    from database import get_pool_metrics
+    from services.folder_catalog import public_folder_catalog
+    from services.note_reaper import note_reaper
+    from services.principal_cache import principal_cache
+    from services.password_hashing import password_hasher
+    from services.extraction import extraction_service
+    from services.upload_jobs import upload_job_queue
+    from services.extraction_cache import extraction_cache
+    return {
+        "websockets": manager.get_message_stats(),
+        "executor": blocking_executor.get_metrics(),
+        "db_pool": get_pool_metrics(),
+        "folder_catalog": public_folder_catalog.get_metrics(),
+        "note_reaper": note_reaper.get_metrics(),
+        "auth_cache": principal_cache.get_metrics(),
+        "password_hashing": password_hasher.get_metrics(),
+        "extraction": extraction_service.get_metrics(),
+        "upload_jobs": upload_job_queue.get_metrics(),
+        "extraction_cache": extraction_cache.get_metrics(),
+    }
+
 @app.post("/setup-db")
 async def setup_database():
     try:
@@ -129,11 +198,11 @@ app.include_router(dashboard.router)
 
 # Test endpoint to verify models work
 @app.get("/test-db")
-async def test_database(db: Session = Depends(get_db)):
+async def test_database(db: AsyncSession = Depends(get_async_db)):
     try:
         # Count users and folders
-        user_count = db.query(User).count()
-        folder_count = db.query(ClassFolder).count()
+        user_count = await db.scalar(select(func.count()).select_from(User))
+        folder_count = await db.scalar(select(func.count()).select_from(ClassFolder))
         
         return {
             "users": user_count,
@@ -1,6 +1,6 @@
 # models/__init__.py
 from .user import User, UserAchievement, UserFolderStats
-from .education import ClassFolder, Question, QuestionOption, TempNote
+from .education import ClassFolder, Question, QuestionOption, TempNote, ExtractionCacheEntry
 from .battle import Battle, BattleAnswerResponse, PendingInvite
 
 # Make Base available for migrations
@@ -8,6 +8,6 @@ from .user import Base
 
 __all__ = [
     'Base', 'User', 'UserAchievement', 'UserFolderStats',
-    'ClassFolder', 'Question', 'QuestionOption', 'TempNote',
+    'ClassFolder', 'Question', 'QuestionOption', 'TempNote', 'ExtractionCacheEntry',
     'Battle', 'BattleAnswerResponse', 'PendingInvite'
 ]
\ No newline at end of file
@@ -1,6 +1,6 @@
 from database import Base
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Text, Boolean, UniqueConstraint, CheckConstraint, func, Numeric, text, DateTime
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Text, Boolean, UniqueConstraint, CheckConstraint, Index, func, Numeric, text, DateTime
+from .types import GUID
 import uuid
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -8,16 +8,16 @@ from datetime import datetime
 class Battle(Base):
     __tablename__ = 'battles'
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    challenger_id = Column(UUID(as_uuid=True), ForeignKey('users.id'), nullable=False)
-    opponent_id = Column(UUID(as_uuid=True), ForeignKey('users.id'), nullable=True)
-    class_folder_id = Column(UUID(as_uuid=True), ForeignKey('class_folders.id'), nullable=False)
+    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
+    challenger_id = Column(GUID(), ForeignKey('users.id'), nullable=False)
+    opponent_id = Column(GUID(), ForeignKey('users.id'), nullable=True)
+    class_folder_id = Column(GUID(), ForeignKey('class_folders.id'), nullable=False)
     battle_status = Column(String(20), default='pending')  # 'pending', 'active', 'completed', 'cancelled'
     total_questions = Column(Integer, default=10)
     time_limit_seconds = Column(Integer, default=300)  # 5 minutes default
     challenger_score = Column(Integer, default=0)
     opponent_score = Column(Integer, default=0)
-    winner_id = Column(UUID(as_uuid=True), ForeignKey('users.id'))
+    winner_id = Column(GUID(), ForeignKey('users.id'))
     started_at = Column(DateTime(timezone=True))
     completed_at = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -38,14 +38,26 @@ class Battle(Base):
             '(opponent_id IS NULL) OR (challenger_id != opponent_id)', 
             name='different_battle_participants'
         ),
+        # "my battles" and dashboard lookups filter each side by status
+        Index('ix_battles_challenger_status', 'challenger_id', 'battle_status'),
+        Index('ix_battles_opponent_status', 'opponent_id', 'battle_status'),
+        # Keyset pagination of a user's battle history, one index per side
+        Index('ix_battles_challenger_created', 'challenger_id', 'created_at', 'id'),
+        Index('ix_battles_opponent_created', 'opponent_id', 'created_at', 'id'),
+        # Pending invitations are a small, hot slice of the table
+        Index(
+            'ix_battles_pending_opponent', 'opponent_id',
+            postgresql_where=text("battle_status = 'pending'"),
+            sqlite_where=text("battle_status = 'pending'")
+        ),
     )
 class BattleAnswerResponse(Base):
     __tablename__ = 'battle_responses'
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    battle_id = Column(UUID(as_uuid=True), ForeignKey('battles.id', ondelete='CASCADE'), nullable=False)
-    question_id = Column(UUID(as_uuid=True), ForeignKey('questions.id'), nullable=False)
-    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id'), nullable=False)
+    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
+    battle_id = Column(GUID(), ForeignKey('battles.id', ondelete='CASCADE'), nullable=False)
+    question_id = Column(GUID(), ForeignKey('questions.id'), nullable=False)
+    user_id = Column(GUID(), ForeignKey('users.id'), nullable=False)
     user_answer = Column(Text, nullable=False)
     is_correct = Column(Boolean, nullable=False)
     points_earned = Column(Integer, default=0)
@@ -60,14 +72,16 @@ class BattleAnswerResponse(Base):
     # Constraints
     __table_args__ = (
         UniqueConstraint('battle_id', 'question_id', 'user_id', name='unique_battle_question_response'),
+        Index('ix_battle_responses_battle_user', 'battle_id', 'user_id'),
+        Index('ix_battle_responses_user', 'user_id'),
     )
 
 class PendingInvite(Base):
     __tablename__ = "pending_invites"
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id'), nullable=False)
-    battle_id = Column(UUID(as_uuid=True), ForeignKey('battles.id'), nullable=False)
+    user_id = Column(GUID(), ForeignKey('users.id'), nullable=False)
+    battle_id = Column(GUID(), ForeignKey('battles.id'), nullable=False)
     invite_data = Column(Text, nullable=False)  # JSON string containing invite details
     created_at = Column(DateTime, default=datetime.utcnow)
     is_read = Column(Boolean, default=False)
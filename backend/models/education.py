@@ -1,13 +1,31 @@
 from database import Base
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Text, Boolean, UniqueConstraint, CheckConstraint, func, Numeric, text
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Text, Boolean, UniqueConstraint, CheckConstraint, Index, func, Numeric, text
+from .types import GUID
 import uuid
 from sqlalchemy.orm import relationship
+from datetime import datetime, timedelta, timezone
+
+# Weighted full-text document for folder search; the search query must repeat
+# this expression verbatim for PostgreSQL to use ix_class_folders_search
+FOLDER_SEARCH_DOCUMENT = (
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(course_code, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(university_name, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+)
+
+# Uploaded notes are temporary and removed by the cleanup job after this long
+NOTE_TTL = timedelta(hours=24)
+
+def default_note_expiry():
+    """Expiry for a newly uploaded note, computed client-side so any database works"""
+    return datetime.now(timezone.utc) + NOTE_TTL
+
 class ClassFolder(Base):
     __tablename__ = 'class_folders'
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    owner_id = Column(UUID(as_uuid=True), ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
+    owner_id = Column(GUID(), ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     name = Column(String(255), nullable=False)  # e.g., "Calculus I", "Organic Chemistry"
     description = Column(Text)
     course_code = Column(String(50))  # e.g., "MATH 101", "CHEM 2420"
@@ -25,15 +43,27 @@ class ClassFolder(Base):
     battles = relationship("Battle", back_populates="class_folder")
     user_stats = relationship("UserFolderStats", back_populates="class_folder", cascade="all, delete-orphan")
     
-    # Constraints
+    # Constraints; unique_user_folder_name also serves owner_id lookups
     __table_args__ = (
         UniqueConstraint('owner_id', 'name', name='unique_user_folder_name'),
+        Index('ix_class_folders_owner_created', 'owner_id', 'created_at', 'id'),
+        Index(
+            'ix_class_folders_public_created', 'created_at', 'id',
+            postgresql_where=text('is_public'),
+            sqlite_where=text('is_public')
+        ),
+        # Other databases search through services.folder_search's in-process index
+        Index(
+            'ix_class_folders_search', text(f"({FOLDER_SEARCH_DOCUMENT})"),
+            postgresql_using='gin',
+            postgresql_where=text('is_public')
+        ).ddl_if(dialect='postgresql'),
     )
 class Question(Base):
     __tablename__ = 'questions'
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    class_folder_id = Column(UUID(as_uuid=True), ForeignKey('class_folders.id', ondelete='CASCADE'), nullable=False)
+    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
+    class_folder_id = Column(GUID(), ForeignKey('class_folders.id', ondelete='CASCADE'), nullable=False)
     question_text = Column(Text, nullable=False)
     question_type = Column(String(50), nullable=False)  # 'multiple_choice', 'true_false', 'short_answer', 'essay'
     difficulty_level = Column(String(20), default='medium')  # 'easy', 'medium', 'hard'
@@ -50,11 +80,16 @@ class Question(Base):
     class_folder = relationship("ClassFolder", back_populates="questions")
     options = relationship("QuestionOption", back_populates="question", cascade="all, delete-orphan")
     battle_answer_responses = relationship("BattleAnswerResponse", back_populates="question")
+    
+    __table_args__ = (
+        Index('ix_questions_folder_difficulty_type', 'class_folder_id', 'difficulty_level', 'question_type'),
+        Index('ix_questions_folder_created', 'class_folder_id', 'created_at', 'id'),
+    )
 class QuestionOption(Base):
     __tablename__ = 'question_options'
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    question_id = Column(UUID(as_uuid=True), ForeignKey('questions.id', ondelete='CASCADE'), nullable=False)
+    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
+    question_id = Column(GUID(), ForeignKey('questions.id', ondelete='CASCADE'), nullable=False)
     option_letter = Column(String(1), nullable=False)  # A, B, C, D
     option_text = Column(Text, nullable=False)
     is_correct = Column(Boolean, default=False)
@@ -69,16 +104,38 @@ class QuestionOption(Base):
 class TempNote(Base):
     __tablename__ = 'temp_notes'
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
-    class_folder_id = Column(UUID(as_uuid=True), ForeignKey('class_folders.id', ondelete='CASCADE'), nullable=False)
+    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
+    user_id = Column(GUID(), ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    class_folder_id = Column(GUID(), ForeignKey('class_folders.id', ondelete='CASCADE'), nullable=False)
     file_name = Column(String(255), nullable=False)
     file_type = Column(String(50))  # pdf, txt, docx, etc.
     content = Column(Text, nullable=False)  # extracted text content
     file_size = Column(Integer)  # in bytes
     uploaded_at = Column(DateTime(timezone=True), server_default=func.now())
-    expires_at = Column(DateTime(timezone=True), server_default=text("NOW() + INTERVAL '24 hours'"))
+    expires_at = Column(DateTime(timezone=True), default=default_note_expiry)
     
     # Relationships
     user = relationship("User", back_populates="temp_notes")
     class_folder = relationship("ClassFolder", back_populates="temp_notes")
+    
+    __table_args__ = (
+        Index('ix_temp_notes_class_folder', 'class_folder_id'),
+        Index('ix_temp_notes_expires_at', 'expires_at'),
+    )
+class ExtractionCacheEntry(Base):
+    __tablename__ = 'extraction_cache'
+    
+    # Index of cleaned extraction output stored on local disk, keyed by upload content
+    sha256 = Column(String(64), primary_key=True)  # hex digest of the uploaded bytes
+    content_type = Column(String(100), nullable=False)
+    extractor_version = Column(Integer, nullable=False)  # entries from older extraction code are ignored
+    source_size = Column(Integer)  # uploaded bytes
+    text_size = Column(Integer, nullable=False)  # bytes of cached text on disk
+    hits = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        # Least recently used entries are evicted first
+        Index('ix_extraction_cache_last_used', 'last_used_at'),
+    )
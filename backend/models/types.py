@@ -0,0 +1,25 @@
+import uuid
+from sqlalchemy import Uuid
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql import functions
+from sqlalchemy.types import TypeDecorator
+
+
+class GUID(TypeDecorator):
+    """UUID column that is native on PostgreSQL and CHAR(32) on other databases"""
+    impl = Uuid
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        # Handlers pass ids both as uuid.UUID and as strings
+        if value is not None and not isinstance(value, uuid.UUID):
+            value = uuid.UUID(str(value))
+        return value
+
+
+@compiles(functions.now, "sqlite")
+def sqlite_now(element, compiler, **kw):
+    # CURRENT_TIMESTAMP has no fractional seconds, so rows stamped by the
+    # database wouldn't compare correctly against datetimes bound from Python
+    # (stored as "YYYY-MM-DD HH:MM:SS.ffffff"), which keyset pagination relies on
+    return "STRFTIME('%Y-%m-%d %H:%M:%f000', 'now')"
@@ -1,6 +1,6 @@
 
 from sqlalchemy import Column, String, Integer, Boolean, Text, DateTime, ForeignKey, CheckConstraint, UniqueConstraint, Numeric
-from sqlalchemy.dialects.postgresql import UUID
+from .types import GUID
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -11,7 +11,7 @@ from database import Base
 class User(Base):
     __tablename__ = 'users'
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
     email = Column(String(255), unique=True, nullable=False)
     username = Column(String(50), unique=True, nullable=False)
     full_name = Column(String(100))
@@ -37,8 +37,8 @@ class User(Base):
 class UserAchievement(Base):
     __tablename__ = 'user_achievements'
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
+    user_id = Column(GUID(), ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     achievement_type = Column(String(50), nullable=False)  # 'streak', 'speed_demon', 'scholar', etc.
     achievement_name = Column(String(100), nullable=False)
     description = Column(Text)
@@ -54,9 +54,9 @@ class UserAchievement(Base):
 class UserFolderStats(Base):
     __tablename__ = 'user_folder_stats'
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
-    class_folder_id = Column(UUID(as_uuid=True), ForeignKey('class_folders.id', ondelete='CASCADE'), nullable=False)
+    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
+    user_id = Column(GUID(), ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    class_folder_id = Column(GUID(), ForeignKey('class_folders.id', ondelete='CASCADE'), nullable=False)
     questions_answered = Column(Integer, default=0)
     questions_correct = Column(Integer, default=0)
     total_points_earned = Column(Integer, default=0)
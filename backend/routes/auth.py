@@ -12,8 +12,8 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 
 # route to sign up a new user
 @router.post("/signup", response_model=TokenResponse)
-def signup(user_data: UserCreateRequest, db: Session = Depends(get_db)):
-    user = create_user(user_data, db)
+async def signup(user_data: UserCreateRequest, db: Session = Depends(get_db)):
+    user = await create_user(user_data, db)
     access_token = create_access_token(data={"sub": str(user.id)})
     return {
         "access_token": access_token, 
@@ -22,8 +22,8 @@ def signup(user_data: UserCreateRequest, db: Session = Depends(get_db)):
 
 # route to login a user and generates a JWT token
 @router.post("/login", response_model=TokenResponse)
-def login(form_data: LoginRequest, db: Session = Depends(get_db)):
-    user = authenticate_user(form_data.email, form_data.password, db)
+async def login(form_data: LoginRequest, db: Session = Depends(get_db)):
+    user = await authenticate_user(form_data.email, form_data.password, db)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     access_token = create_access_token(data={"sub": str(user.id)})
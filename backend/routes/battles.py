@@ -1,15 +1,16 @@
-from fastapi import APIRouter, HTTPException, Depends, WebSocket, WebSocketDisconnect, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Query, Response, WebSocket, WebSocketDisconnect, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime
 import uuid
-import json
 import logging
-from models import Battle, User, ClassFolder
-from database import get_db
+from models import Battle, ClassFolder
+from database import get_async_db
 from schemas import CreateBattleRequest, SubmitAnswerRequest, BattleResponse
 from services import (
     get_current_user,
+    Principal,
     create_battle,
     accept_battle,
     submit_answer,
@@ -21,6 +22,9 @@ from services import (
     get_pending_battle_invitations,
     manager
 )
+from services.ws_codec import InvalidFrame, decode_client_frame
+from services.websocket_manager import normalize_topic
+from services.pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/battles", tags=["battles"])
@@ -56,8 +60,8 @@ async def handle_service_call(service_func, *args, **kwargs):
 @router.post("/create", response_model=BattleResponse)
 async def create_battle_route(
     battle_request: CreateBattleRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new battle (public or private)"""
     return await handle_service_call(
@@ -71,16 +75,18 @@ async def create_battle_route(
 @router.post("/join/{room_code}")
 async def join_battle_with_code(
     room_code: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Join a public battle using room code"""
     validate_room_code(room_code)
     
-    battle = db.query(Battle).filter(
-        Battle.room_code == room_code,
-        Battle.battle_status == "pending"
-    ).first()
+    battle = await db.scalar(
+        select(Battle).where(
+            Battle.room_code == room_code,
+            Battle.battle_status == "pending"
+        )
+    )
     
     if not battle:
         raise HTTPException(404, "Invalid code or battle already started")
@@ -93,8 +99,8 @@ async def join_battle_with_code(
 @router.post("/submit-answer")
 async def submit_answer_route(
     answer_request: SubmitAnswerRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Submit an answer in an active battle"""
     logger.info(f"Received submit answer request: {answer_request}")
@@ -103,8 +109,8 @@ async def submit_answer_route(
 @router.post("/{battle_id}/accept")
 async def accept_battle_invite(
     battle_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Accept a battle invitation"""
     validate_uuid(battle_id, "battle ID")
@@ -113,19 +119,19 @@ async def accept_battle_invite(
 @router.post("/{battle_id}/decline")
 async def decline_battle_invite(
     battle_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Decline a battle invitation"""
     battle_uuid = validate_uuid(battle_id, "battle ID")
     
     try:
-        battle = db.query(Battle).filter(Battle.id == battle_uuid).first()
+        battle = await db.scalar(select(Battle).where(Battle.id == battle_uuid))
         if not battle:
             raise HTTPException(404, "Battle not found")
         
         battle.battle_status = "declined"
-        db.commit()
+        await db.commit()
         
         await manager.send_personal_message({
             "type": "BATTLE_DECLINED",
@@ -136,23 +142,29 @@ async def decline_battle_invite(
         return {"status": "declined"}
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(500, str(e))
 
 # ==================== BATTLE DATA ====================
 @router.get("/my-battles", response_model=List[BattleResponse])
 async def get_my_battles_route(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; omit for all battles"),
+    cursor: Optional[str] = Query(None, description=f"Value of the previous page's {NEXT_CURSOR_HEADER} header"),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all battles for current user"""
-    return await handle_service_call(get_my_battles, current_user, db)
+    """Get the current user's battles, newest first"""
+    battles, next_cursor = await handle_service_call(get_my_battles, current_user, db, limit, cursor)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return battles
 
 @router.get("/questions/{battle_id}")
 async def get_battle_questions_route(
     battle_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get questions for a specific battle"""
     validate_uuid(battle_id, "battle ID")
@@ -161,8 +173,8 @@ async def get_battle_questions_route(
 @router.get("/results/{battle_id}")
 async def get_battle_results_route(
     battle_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get results for a completed battle"""
     validate_uuid(battle_id, "battle ID")
@@ -171,8 +183,8 @@ async def get_battle_results_route(
 @router.get("/{battle_id}", response_model=BattleResponse)
 async def get_battle_by_id_route(
     battle_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get battle details by ID"""
     validate_uuid(battle_id, "battle ID")
@@ -185,14 +197,14 @@ async def get_battle_by_id_route(
 @router.get("/{battle_id}/status")
 async def get_battle_status_route(
     battle_id: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get battle status for polling"""
     validate_uuid(battle_id, "battle ID")
     
     try:
-        battle = db.query(Battle).filter(Battle.id == validate_uuid(battle_id, "battle ID")).first()
+        battle = await db.scalar(select(Battle).where(Battle.id == validate_uuid(battle_id, "battle ID")))
         if not battle:
             raise HTTPException(404, "Battle not found")
         
@@ -222,8 +234,7 @@ async def get_battle_status_route(
 @router.websocket("/ws/{user_id}")
 async def websocket_endpoint(
     websocket: WebSocket, 
-    user_id: str,
-    db: Session = Depends(get_db)
+    user_id: str
 ):
     """Handle real-time battle updates"""
     await manager.connect(websocket, user_id)
@@ -231,23 +242,47 @@ async def websocket_endpoint(
     
     try:
         while True:
-            data = await websocket.receive_text()
-            message = json.loads(data)
-            await handle_websocket_message(websocket, user_id, message)
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", 1000))
+            # Binary-protocol clients may send msgpack frames too
+            try:
+                message = decode_client_frame(frame)
+            except InvalidFrame as e:
+                # A bad frame is answered, not fatal; the connection stays open
+                await manager.send_control_message({
+                    "type": "ERROR",
+                    "code": "INVALID_MESSAGE",
+                    "message": str(e)
+                }, user_id)
+                continue
+            if message:
+                await handle_websocket_message(websocket, user_id, message)
 
     except WebSocketDisconnect:
-        manager.disconnect(user_id)
+        manager.disconnect(user_id, websocket)
         logger.info(f"User {user_id} disconnected")
     except Exception as e:
         logger.error(f"WebSocket error: {str(e)}")
-        manager.disconnect(user_id)
+        manager.disconnect(user_id, websocket)
+
+def requested_topics(message: dict) -> Optional[List[str]]:
+    """Normalized topics named by a SUBSCRIBE/UNSUBSCRIBE message, or None if any is malformed or unknown"""
+    topics = message["topics"] if "topics" in message else [message.get("topic")]
+    # A bare string would otherwise be iterated one character at a time
+    if not isinstance(topics, list) or not topics:
+        return None
+    normalized = [normalize_topic(topic) if isinstance(topic, str) else None for topic in topics]
+    if None in normalized:
+        return None
+    return normalized
 
 async def handle_websocket_message(websocket: WebSocket, user_id: str, message: dict):
     """Handle different types of WebSocket messages"""
     message_type = message.get("type")
     
     if message_type == "ping":
-        await websocket.send_json({"type": "pong"})
+        await manager.send_control_message({"type": "pong"}, user_id)
         
     elif message_type == "ACCEPT_BATTLE":
         battle_id = message.get("battleId")
@@ -263,6 +298,30 @@ async def handle_websocket_message(websocket: WebSocket, user_id: str, message:
                 message.get("challengerId", "")
             )
             
+    elif message_type == "RESUME":
+        # Client reconnected after a drop; replay what it missed instead of polling
+        try:
+            last_seq = int(message.get("last_seq", 0))
+        except (TypeError, ValueError):
+            last_seq = 0
+        await manager.resume(user_id, last_seq)
+
+    elif message_type in ("SUBSCRIBE", "UNSUBSCRIBE"):
+        topics = requested_topics(message)
+        if topics is None:
+            await manager.send_control_message({
+                "type": "ERROR",
+                "code": "INVALID_TOPICS",
+                "message": "topics must be a list of lobby, folder:<id> or university:<name> topic names"
+            }, user_id)
+        elif message_type == "SUBSCRIBE":
+            subscribed = [topic for topic in topics if manager.subscribe(user_id, topic)]
+            await manager.send_control_message({"type": "SUBSCRIBED", "topics": subscribed}, user_id)
+        else:
+            for topic in topics:
+                manager.unsubscribe(user_id, topic)
+            await manager.send_control_message({"type": "UNSUBSCRIBED", "topics": topics}, user_id)
+
     elif message_type == "BATTLE_UPDATE":
         await manager.broadcast_to_battle(
             message,
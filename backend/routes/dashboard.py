@@ -1,102 +1,114 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy import select, func, desc
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 from typing import List
 from uuid import UUID
 
-from database import get_db
+from database import get_read_db
 from models import User, Battle, BattleAnswerResponse, ClassFolder, TempNote
-from services.auth import get_current_user
+from services.auth import get_current_user, Principal
+from services.blocking import run_blocking
 from schemas.dashboard import UserStatsResponse, RecentActivityResponse
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
 @router.get("/stats")
 async def get_user_stats(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get comprehensive user statistics for dashboard"""
     try:
         user_id = current_user.id
         
         # Get total notes (temp notes count)
-        total_notes = db.query(TempNote).filter(
-            TempNote.user_id == user_id
-        ).count()
+        total_notes = await db.scalar(
+            select(func.count()).select_from(TempNote).where(
+                TempNote.user_id == user_id
+            )
+        )
         
         # Get battle statistics
-        user_battles = db.query(Battle).filter(
-            (Battle.challenger_id == user_id) | (Battle.opponent_id == user_id),
-            Battle.battle_status == "completed"
-        ).all()
-        
-        total_battles = len(user_battles)
-        
-        # Calculate wins and losses
-        wins = 0
-        losses = 0
-        total_score = 0
-        best_score = 0
-        
-        for battle in user_battles:
-            if battle.winner_id == user_id:
-                wins += 1
-            elif battle.winner_id is not None:  # Not a tie
-                losses += 1
-            
-            # Get user's score for this battle
-            user_score = battle.challenger_score if battle.challenger_id == user_id else battle.opponent_score
-            total_score += user_score
-            best_score = max(best_score, user_score)
-        
-        # Calculate win rate
-        win_rate = round((wins / total_battles * 100) if total_battles > 0 else 0, 1)
-        
-        # Calculate current streak (consecutive wins)
-        current_streak = 0
-        recent_battles = sorted(user_battles, key=lambda x: x.completed_at, reverse=True)
-        
-        for battle in recent_battles:
-            if battle.winner_id == user_id:
-                current_streak += 1
-            else:
-                break
+        user_battles = (await db.scalars(
+            select(Battle).where(
+                (Battle.challenger_id == user_id) | (Battle.opponent_id == user_id),
+                Battle.battle_status == "completed"
+            )
+        )).all()
         
         # Get question statistics
-        user_responses = db.query(BattleAnswerResponse).filter(
-            BattleAnswerResponse.user_id == user_id
-        ).all()
+        user_responses = (await db.scalars(
+            select(BattleAnswerResponse).where(
+                BattleAnswerResponse.user_id == user_id
+            )
+        )).all()
         
-        total_questions_answered = len(user_responses)
-        correct_answers = len([r for r in user_responses if r.is_correct])
-        accuracy = round((correct_answers / total_questions_answered * 100) if total_questions_answered > 0 else 0, 1)
-        
-        # Calculate average score
-        average_score = round(total_score / total_battles, 1) if total_battles > 0 else 0
-        
-        return UserStatsResponse(
-            total_notes=total_notes,
-            total_battles=total_battles,
-            win_rate=win_rate,
-            current_streak=current_streak,
-            total_wins=wins,
-            total_losses=losses,
-            average_score=average_score,
-            best_score=best_score,
-            total_questions_answered=total_questions_answered,
-            correct_answers=correct_answers,
-            accuracy=accuracy
-        )
+        # Aggregation is O(battles + answers); keep it off the event loop
+        return await run_blocking(summarize_user_stats, user_id, total_notes, user_battles, user_responses)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch user stats: {str(e)}")
 
+def summarize_user_stats(user_id, total_notes: int, user_battles: List[Battle], user_responses: List[BattleAnswerResponse]) -> UserStatsResponse:
+    """Compute dashboard statistics from a user's completed battles and answers"""
+    total_battles = len(user_battles)
+    
+    # Calculate wins and losses
+    wins = 0
+    losses = 0
+    total_score = 0
+    best_score = 0
+    
+    for battle in user_battles:
+        if battle.winner_id == user_id:
+            wins += 1
+        elif battle.winner_id is not None:  # Not a tie
+            losses += 1
+        
+        # Get user's score for this battle
+        user_score = battle.challenger_score if battle.challenger_id == user_id else battle.opponent_score
+        total_score += user_score
+        best_score = max(best_score, user_score)
+    
+    # Calculate win rate
+    win_rate = round((wins / total_battles * 100) if total_battles > 0 else 0, 1)
+    
+    # Calculate current streak (consecutive wins)
+    current_streak = 0
+    recent_battles = sorted(user_battles, key=lambda x: x.completed_at, reverse=True)
+    
+    for battle in recent_battles:
+        if battle.winner_id == user_id:
+            current_streak += 1
+        else:
+            break
+    
+    total_questions_answered = len(user_responses)
+    correct_answers = len([r for r in user_responses if r.is_correct])
+    accuracy = round((correct_answers / total_questions_answered * 100) if total_questions_answered > 0 else 0, 1)
+    
+    # Calculate average score
+    average_score = round(total_score / total_battles, 1) if total_battles > 0 else 0
+    
+    return UserStatsResponse(
+        total_notes=total_notes,
+        total_battles=total_battles,
+        win_rate=win_rate,
+        current_streak=current_streak,
+        total_wins=wins,
+        total_losses=losses,
+        average_score=average_score,
+        best_score=best_score,
+        total_questions_answered=total_questions_answered,
+        correct_answers=correct_answers,
+        accuracy=accuracy
+    )
+
 @router.get("/recent-activity")
 async def get_recent_activity(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get recent user activity for dashboard"""
     try:
@@ -104,15 +116,17 @@ async def get_recent_activity(
         activities = []
         
         # Get recent battles (last 10)
-        recent_battles = db.query(Battle).filter(
-            (Battle.challenger_id == user_id) | (Battle.opponent_id == user_id),
-            Battle.battle_status == "completed"
-        ).order_by(desc(Battle.completed_at)).limit(10).all()
+        recent_battles = (await db.scalars(
+            select(Battle).where(
+                (Battle.challenger_id == user_id) | (Battle.opponent_id == user_id),
+                Battle.battle_status == "completed"
+            ).order_by(desc(Battle.completed_at)).limit(10)
+        )).all()
         
         for battle in recent_battles:
             # Get opponent username
             opponent_id = battle.opponent_id if battle.challenger_id == user_id else battle.challenger_id
-            opponent = db.query(User).filter(User.id == opponent_id).first()
+            opponent = await db.scalar(select(User).where(User.id == opponent_id))
             opponent_username = opponent.username if opponent else "Unknown"
             
             # Get user's score
@@ -144,13 +158,15 @@ async def get_recent_activity(
                 ))
         
         # Get recent note uploads (last 5)
-        recent_notes = db.query(TempNote).filter(
-            TempNote.user_id == user_id
-        ).order_by(desc(TempNote.uploaded_at)).limit(5).all()
+        recent_notes = (await db.scalars(
+            select(TempNote).where(
+                TempNote.user_id == user_id
+            ).order_by(desc(TempNote.uploaded_at)).limit(5)
+        )).all()
         
         for note in recent_notes:
             # Get folder name
-            folder = db.query(ClassFolder).filter(ClassFolder.id == note.class_folder_id).first()
+            folder = await db.scalar(select(ClassFolder).where(ClassFolder.id == note.class_folder_id))
             folder_name = folder.name if folder else "Unknown Folder"
             
             activities.append(RecentActivityResponse(
@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import Optional, List
 import uuid
-from database import get_db
+from database import get_async_db, get_read_db
 from schemas import CreateFolderRequest, FolderResponse, QuestionResponse
-from services import create_folder, get_public_folders, get_my_folders
-from services.auth import get_current_user
-from models import ClassFolder, User, Question
+from services import create_folder, get_my_folders
+from services.folder_catalog import public_folder_catalog
+from services.auth import get_current_user, Principal
+from services.folder_search import search_public_folders
+from services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, is_paginated, keyset_page, split_page
+from models import ClassFolder, Question
 
 router = APIRouter(prefix="/folders", tags=["folders"])
 
@@ -14,8 +19,8 @@ router = APIRouter(prefix="/folders", tags=["folders"])
 @router.post("/", response_model=FolderResponse)
 async def create_class_folder(
     folder_data: CreateFolderRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)  
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)  
 ):
     """Create a new class folder"""
     try:
@@ -37,40 +42,82 @@ async def create_class_folder(
 async def get_public_class_folders(
     university: Optional[str] = Query(None, description="Filter by university"),
     course: Optional[str] = Query(None, description="Filter by course"),
-    db: Session = Depends(get_db)
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; omit for all folders"),
+    cursor: Optional[str] = Query(None, description=f"Value of the previous page's {NEXT_CURSOR_HEADER} header")
 ):
     """Get public class folders with optional filters"""
     try:
 
-        folders = await get_public_folders(
+        # Served from the in-memory catalog, already serialized
+        body, next_cursor = await public_folder_catalog.list_public(
             university=university,
             course=course,
-            db=db
+            limit=limit,
+            cursor=cursor
         )
+        headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+        return Response(content=body, media_type="application/json", headers=headers)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# route to get public folder counts by university and course code
+@router.get("/public/facets")
+async def get_public_folder_facets():
+    """Get public folder counts by university and course code"""
+    return await public_folder_catalog.facets()
+
+# route to search public class folders by name, course code, university and description
+@router.get("/search", response_model=List[FolderResponse])
+async def search_class_folders(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Search text; each word matches as a prefix"),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description=f"Value of the previous page's {NEXT_CURSOR_HEADER} header"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Search public class folders, best matches first"""
+    try:
+
+        folders, next_cursor = await search_public_folders(q, db, limit, cursor)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         
-        # Convert to list of Pydantic models
         return [FolderResponse.from_orm(folder) for folder in folders]
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # route to get current user's class folders
 @router.get("/my", response_model=List[FolderResponse])
 async def get_my_class_folders(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)  
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; omit for all folders"),
+    cursor: Optional[str] = Query(None, description=f"Value of the previous page's {NEXT_CURSOR_HEADER} header"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)  
 ):
     """Get current user's folders"""
     try:
 
-        folders = await get_my_folders(
+        folders, next_cursor = await get_my_folders(
             db=db,
-            user_id=str(current_user.id) 
+            user_id=str(current_user.id),
+            limit=limit,
+            cursor=cursor
         )
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         
         # Convert to list of Pydantic models
         return [FolderResponse.from_orm(folder) for folder in folders]
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -78,14 +125,14 @@ async def get_my_class_folders(
 @router.get("/{folder_id}", response_model=FolderResponse)
 async def get_folder_by_id(
     folder_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get a specific folder by ID"""
     try:
         folder_uuid = uuid.UUID(folder_id)
         
-        folder = db.query(ClassFolder).filter(ClassFolder.id == folder_uuid).first()
+        folder = await db.scalar(select(ClassFolder).where(ClassFolder.id == folder_uuid))
         
         if not folder:
             raise HTTPException(status_code=404, detail="Folder not found")
@@ -104,10 +151,13 @@ async def get_folder_by_id(
 @router.get("/{folder_id}/questions", response_model=List[QuestionResponse])
 async def get_questions_in_folder(
     folder_id: str,
+    response: Response,
     difficulty: Optional[str] = Query(None, description="Filter by difficulty level"),
     question_type: Optional[str] = Query(None, description="Filter by question type"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; omit for all questions"),
+    cursor: Optional[str] = Query(None, description=f"Value of the previous page's {NEXT_CURSOR_HEADER} header"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get all questions in a specific folder with optional filters"""
     try:
@@ -115,27 +165,38 @@ async def get_questions_in_folder(
         folder_uuid = uuid.UUID(folder_id)
         
         # Check folder exists and user has access
-        folder = db.query(ClassFolder).filter(ClassFolder.id == folder_uuid).first()
+        folder = await db.scalar(select(ClassFolder).where(ClassFolder.id == folder_uuid))
         if not folder:
             raise HTTPException(status_code=404, detail="Folder not found")
             
         if folder.owner_id != current_user.id and not folder.is_public:
             raise HTTPException(status_code=403, detail="Access denied")
         
-        # Base query
-        query = db.query(Question).filter(Question.class_folder_id == folder_uuid)
+        # Base query; options are eager-loaded since the response includes them
+        query = select(Question).options(
+            selectinload(Question.options)
+        ).where(Question.class_folder_id == folder_uuid)
         
         # Apply filters if provided
         if difficulty:
-            query = query.filter(Question.difficulty_level == difficulty.lower())
+            query = query.where(Question.difficulty_level == difficulty.lower())
         if question_type:
-            query = query.filter(Question.question_type == question_type)
+            query = query.where(Question.question_type == question_type)
+        
+        if not is_paginated(limit, cursor):
+            return (await db.scalars(query.order_by(Question.created_at.desc()))).all()
         
-        questions = query.order_by(Question.created_at.desc()).all()
+        limit = limit or DEFAULT_PAGE_SIZE
+        rows = (await db.scalars(keyset_page(query, Question.created_at, Question.id, limit, cursor))).all()
+        questions, next_cursor = split_page(rows, limit)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         
         return questions
         
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid folder ID format")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -8,12 +8,13 @@ from models import TempNote, ClassFolder, Question
 from services.note_processor import NoteProcessor
 from services.question_generator import QuestionGenerator
 from database import get_db
-from services import upload_notes, generate_questions, cleanup_expired_notes
+from services import upload_notes, get_upload_job, generate_questions, cleanup_expired_notes
+from services.auth import get_current_user, Principal
 
 router = APIRouter(prefix="/notes", tags=["notes"])
 
-# route to upload notes to a class folder for processing
-@router.post("/upload/{folder_id}")
+# route to upload notes to a class folder; extraction runs as a background job
+@router.post("/upload/{folder_id}", status_code=202)
 async def upload_notes_route(
     folder_id: str,
     files: List[UploadFile] = File(...),
@@ -21,6 +22,14 @@ async def upload_notes_route(
 ):
    return await upload_notes(folder_id, files, db)
 
+# route to poll the status and progress of an upload job
+@router.get("/jobs/{job_id}")
+async def get_upload_job_route(
+    job_id: str,
+    current_user: Principal = Depends(get_current_user)
+):
+    return await get_upload_job(job_id, current_user)
+
 # route to generate questions from uploaded notes in a class folder
 @router.post("/generate-questions/{folder_id}")
 async def generate_questions_route(
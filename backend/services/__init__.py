@@ -12,11 +12,11 @@ from .battle_services import (
 )
 from .folder_services import (
     create_folder,
-    get_public_folders,
     get_my_folders
 )
 from .notes_services import (
     upload_notes,
+    get_upload_job,
     generate_questions,
     cleanup_expired_notes
 )
@@ -25,7 +25,8 @@ from .auth import (
     get_user_from_token,
     create_user,
     authenticate_user,
-    create_access_token
+    create_access_token,
+    Principal
 )
 from .note_processor import NoteProcessor
 from .question_generator import QuestionGenerator
@@ -37,9 +38,9 @@ __all__ = [
     "submit_answer",
     "get_my_battles",
     "create_folder",
-    "get_public_folders",
     "get_my_folders",
     "upload_notes",
+    "get_upload_job",
     "generate_questions",
     "cleanup_expired_notes",
     "get_current_user",
@@ -47,6 +48,7 @@ __all__ = [
     "QuestionGenerator",
     "manager",
     "get_user_from_token",
+    "Principal",
     "create_user",
     "authenticate_user",
     "create_access_token",
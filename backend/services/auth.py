@@ -1,21 +1,24 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from decouple import config
 
 from models import User
-from database import get_db
+from database import get_db, get_async_db
+from .principal_cache import Principal, principal_cache
+from .password_hashing import pwd_context, password_hasher
+from .blocking import run_blocking
 
 # Config
 SECRET_KEY = config('SECRET_KEY')
 ALGORITHM = config('ALGORITHM', default='HS256')
 ACCESS_TOKEN_EXPIRE_MINUTES = int(config('ACCESS_TOKEN_EXPIRE_MINUTES', default=30))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -30,27 +33,30 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def create_user(user_data, db: Session):
-    existing_user = db.query(User).filter(User.username == user_data.username).first()
+async def create_user(user_data, db: Session):
+    existing_user = await run_blocking(
+        lambda: db.query(User).filter(User.username == user_data.username).first()
+    )
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already registered")
-    password_hash = get_password_hash(user_data.password)
+    # bcrypt runs in the hashing process pool, never on the request threads
+    password_hash = await password_hasher.hash(user_data.password)
     new_user = User(username=user_data.username, email=user_data.email, password_hash=password_hash)
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await run_blocking(db.commit)
+    await run_blocking(db.refresh, new_user)
     return new_user
 
-def authenticate_user(email: str, password: str, db: Session):
-    user = db.query(User).filter(User.email == email).first()
-    if not user or not verify_password(password, user.password_hash):
+async def authenticate_user(email: str, password: str, db: Session):
+    user = await run_blocking(lambda: db.query(User).filter(User.email == email).first())
+    if not user or not await password_hasher.verify(password, user.password_hash):
         return None
     return user
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -60,15 +66,24 @@ async def get_current_user(
     try:
         payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
+        exp = payload.get("exp")
         if user_id is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == user_id).first()
+    # A cached principal skips the users query; the session never checks out a connection
+    principal = principal_cache.get(user_id, exp) if exp is not None else None
+    if principal is not None:
+        return principal
+    
+    user = await db.scalar(select(User).where(User.id == user_id))
     if user is None:
         raise credentials_exception
-    return user
+    principal = Principal.from_user(user)
+    if exp is not None:
+        principal_cache.put(user_id, exp, principal)
+    return principal
 
 async def get_user_from_token(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -1,6 +1,8 @@
 from fastapi import HTTPException
-from sqlalchemy.orm import Session, joinedload
-from typing import List, Optional, Dict
+from sqlalchemy import select, func, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from typing import List, Optional, Dict, Tuple, Union
 from datetime import datetime, timedelta
 from uuid import UUID
 import uuid
@@ -11,9 +13,10 @@ import string
 
 from schemas import CreateBattleRequest, SubmitAnswerRequest, BattleResponse
 from models import Battle, BattleAnswerResponse, Question, User, ClassFolder
-from database import get_db
-from .auth import get_current_user
-from .websocket_manager import manager
+from .auth import get_current_user, Principal
+from .websocket_manager import manager, LOBBY_TOPIC, folder_topic, university_topic
+from .blocking import run_blocking
+from .pagination import DEFAULT_PAGE_SIZE, is_paginated, keyset_page, split_page
 
 logger = logging.getLogger(__name__)
 
@@ -56,7 +59,7 @@ def battle_to_dict(battle: Battle) -> dict:
         "completed_at": battle.completed_at.isoformat() if battle.completed_at else None
     }
 
-def create_battle_response(battle: Battle, challenger: User, opponent: User = None, folder: ClassFolder = None) -> BattleResponse:
+def create_battle_response(battle: Battle, challenger: Union[User, Principal], opponent: User = None, folder: ClassFolder = None) -> BattleResponse:
     """Create a standardized BattleResponse object"""
     return BattleResponse(
         id=str(battle.id),
@@ -73,10 +76,10 @@ def create_battle_response(battle: Battle, challenger: User, opponent: User = No
         is_public=getattr(battle, 'is_public', False)
     )
 
-def get_battle_with_validation(battle_id: str, current_user: User, db: Session, allow_pending: bool = False) -> Battle:
+async def get_battle_with_validation(battle_id: str, current_user: Principal, db: AsyncSession, allow_pending: bool = False) -> Battle:
     """Get battle with common validation logic"""
     battle_uuid = validate_battle_uuid(battle_id)
-    battle = db.query(Battle).filter(Battle.id == battle_uuid).first()
+    battle = await db.scalar(select(Battle).where(Battle.id == battle_uuid))
     
     if not battle:
         raise HTTPException(404, "Battle not found")
@@ -90,7 +93,7 @@ def get_battle_with_validation(battle_id: str, current_user: User, db: Session,
     
     return battle
 
-async def send_battle_notification(battle: Battle, current_user: User, opponent: User, folder: ClassFolder, db: Session):
+async def send_battle_notification(battle: Battle, current_user: Principal, opponent: User, folder: ClassFolder, db: AsyncSession):
     """Handle battle notification logic (WebSocket only - no offline queuing)"""
     invite_message = {
         "type": "BATTLE_INVITATION",
@@ -119,16 +122,18 @@ async def send_battle_notification(battle: Battle, current_user: User, opponent:
         return False
 
 # ==================== PENDING INVITE FUNCTIONS ====================
-async def get_pending_battle_invitations(user_id: str, db: Session) -> List[dict]:
+async def get_pending_battle_invitations(user_id: str, db: AsyncSession) -> List[dict]:
     """Get all pending battle invitations for a user (battles where they are the opponent)"""
     try:
         logger.info(f"Fetching pending battle invitations for user_id: {user_id}")
         
         # Find battles where the user is the opponent and status is pending
-        pending_battles = db.query(Battle).filter(
-            Battle.opponent_id == user_id,
-            Battle.battle_status == "pending"
-        ).all()
+        pending_battles = (await db.scalars(
+            select(Battle).where(
+                Battle.opponent_id == user_id,
+                Battle.battle_status == "pending"
+            )
+        )).all()
         
         logger.info(f"Found {len(pending_battles)} pending battle invitations")
         
@@ -136,8 +141,8 @@ async def get_pending_battle_invitations(user_id: str, db: Session) -> List[dict
         for battle in pending_battles:
             try:
                 # Get challenger and folder info
-                challenger = db.query(User).filter(User.id == battle.challenger_id).first()
-                folder = db.query(ClassFolder).filter(ClassFolder.id == battle.class_folder_id).first()
+                challenger = await db.scalar(select(User).where(User.id == battle.challenger_id))
+                folder = await db.scalar(select(ClassFolder).where(ClassFolder.id == battle.class_folder_id))
                 
                 if not challenger or not folder:
                     logger.warning(f"Missing challenger or folder for battle {battle.id}")
@@ -179,7 +184,7 @@ async def get_pending_battle_invitations(user_id: str, db: Session) -> List[dict
 # Removed: mark_invite_as_read, send_queued_invites_on_connect, cleanup_expired_invites - no longer needed
 
 # ==================== MAIN BATTLE FUNCTIONS ====================
-async def create_battle(battle_request: CreateBattleRequest, current_user: User, db: Session) -> BattleResponse:
+async def create_battle(battle_request: CreateBattleRequest, current_user: Principal, db: AsyncSession) -> BattleResponse:
     """Create a new battle (either private or public) with smart invite handling"""
     try:
         logger.info(f"Creating battle for user {current_user.username}")
@@ -190,7 +195,7 @@ async def create_battle(battle_request: CreateBattleRequest, current_user: User,
 
         # Handle private battle logic
         if battle_request.opponent_username:
-            opponent = db.query(User).filter(User.username == battle_request.opponent_username).first()
+            opponent = await db.scalar(select(User).where(User.username == battle_request.opponent_username))
             
             if not opponent:
                 raise HTTPException(404, "Opponent not found")
@@ -208,12 +213,12 @@ async def create_battle(battle_request: CreateBattleRequest, current_user: User,
             # Public battle
             is_public = True
             room_code = generate_room_code()
-            while db.query(Battle).filter(Battle.room_code == room_code).first():
+            while await db.scalar(select(Battle.id).where(Battle.room_code == room_code)):
                 room_code = generate_room_code()
 
         # Verify class folder
         folder_id = validate_uuid(battle_request.class_folder_id, "folder ID")
-        folder = db.query(ClassFolder).filter(ClassFolder.id == folder_id).first()
+        folder = await db.scalar(select(ClassFolder).where(ClassFolder.id == folder_id))
         
         if not folder:
             raise HTTPException(404, "Class folder not found")
@@ -234,16 +239,19 @@ async def create_battle(battle_request: CreateBattleRequest, current_user: User,
         )
         
         db.add(battle)
-        db.commit()
-        db.refresh(battle)
+        await db.commit()
+        await db.refresh(battle)
 
         # Handle notifications
         if opponent:
             await send_battle_notification(battle, current_user, opponent, folder, db)
         else:
-            # Public battle broadcast
+            # Public battle announcement, only to lobby/folder/university subscribers
+            topics = [LOBBY_TOPIC, folder_topic(str(folder.id))]
+            if folder.university_name:
+                topics.append(university_topic(folder.university_name))
             try:
-                await manager.broadcast({
+                await manager.broadcast_to_topics(topics, {
                     "type": "PUBLIC_BATTLE_CREATED",
                     "room_code": room_code,
                     "battle": {
@@ -254,24 +262,24 @@ async def create_battle(battle_request: CreateBattleRequest, current_user: User,
                         "time_limit_seconds": battle.time_limit_seconds,
                         "is_public": True
                     }
-                })
+                }, exclude_user_id=str(current_user.id))
             except Exception as e:
                 logger.error(f"Error broadcasting public battle: {str(e)}")
 
         return create_battle_response(battle, current_user, opponent, folder)
         
     except HTTPException:
-        db.rollback()
+        await db.rollback()
         raise
     except Exception as e:
         logger.error(f"Unexpected error in create_battle: {str(e)}", exc_info=True)
-        db.rollback()
+        await db.rollback()
         raise HTTPException(500, "Internal server error")
 
-async def accept_battle(battle_id: str, current_user: User, db: Session) -> dict:
+async def accept_battle(battle_id: str, current_user: Principal, db: AsyncSession) -> dict:
     """Accept a battle invitation"""
     try:
-        battle = get_battle_with_validation(battle_id, current_user, db, allow_pending=True)
+        battle = await get_battle_with_validation(battle_id, current_user, db, allow_pending=True)
 
         if battle.battle_status != "pending":
             raise HTTPException(400, "Battle already accepted or completed")
@@ -287,8 +295,8 @@ async def accept_battle(battle_id: str, current_user: User, db: Session) -> dict
         battle.opponent_id = current_user.id
         battle.started_at = datetime.utcnow()
         
-        db.commit()
-        db.refresh(battle)
+        await db.commit()
+        await db.refresh(battle)
 
         # Notify challenger
         await manager.send_personal_message({
@@ -305,35 +313,37 @@ async def accept_battle(battle_id: str, current_user: User, db: Session) -> dict
         return {"status": "joined", "battle": battle_to_dict(battle)}
 
     except HTTPException:
-        db.rollback()
+        await db.rollback()
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Error accepting battle: {str(e)}", exc_info=True)
         raise HTTPException(500, "Internal server error")
 
-async def submit_answer(answer_request: SubmitAnswerRequest, current_user: User, db: Session):
+async def submit_answer(answer_request: SubmitAnswerRequest, current_user: Principal, db: AsyncSession):
     """Submit an answer for a battle question"""
     try:
         logger.info(f"Submitting answer: battle_id={answer_request.battle_id}, question_id={answer_request.question_id}, user_answer={answer_request.user_answer}, time_taken={answer_request.time_taken_seconds}")
-        battle = get_battle_with_validation(answer_request.battle_id, current_user, db)
+        battle = await get_battle_with_validation(answer_request.battle_id, current_user, db)
         
         if battle.battle_status != "active":
             raise HTTPException(400, "Battle is not active")
         
         # Get question
         question_uuid = validate_battle_uuid(answer_request.question_id)
-        question = db.query(Question).filter(Question.id == question_uuid).first()
+        question = await db.scalar(select(Question).where(Question.id == question_uuid))
         
         if not question:
             raise HTTPException(404, "Question not found")
         
         # Check for existing response
-        existing_response = db.query(BattleAnswerResponse).filter(
-            BattleAnswerResponse.battle_id == validate_battle_uuid(answer_request.battle_id),
-            BattleAnswerResponse.question_id == question_uuid,
-            BattleAnswerResponse.user_id == current_user.id
-        ).first()
+        existing_response = await db.scalar(
+            select(BattleAnswerResponse).where(
+                BattleAnswerResponse.battle_id == validate_battle_uuid(answer_request.battle_id),
+                BattleAnswerResponse.question_id == question_uuid,
+                BattleAnswerResponse.user_id == current_user.id
+            )
+        )
         
         if existing_response:
             logger.warning(f"User {current_user.id} already answered question {answer_request.question_id}")
@@ -383,20 +393,24 @@ async def submit_answer(answer_request: SubmitAnswerRequest, current_user: User,
         else:
             battle.opponent_score += points_earned
         
-        db.commit()
+        await db.commit()
         
         # Check if both users have answered this question
-        challenger_answered = db.query(BattleAnswerResponse).filter(
-            BattleAnswerResponse.battle_id == validate_battle_uuid(answer_request.battle_id),
-            BattleAnswerResponse.question_id == question_uuid,
-            BattleAnswerResponse.user_id == battle.challenger_id
-        ).first()
+        challenger_answered = await db.scalar(
+            select(BattleAnswerResponse).where(
+                BattleAnswerResponse.battle_id == validate_battle_uuid(answer_request.battle_id),
+                BattleAnswerResponse.question_id == question_uuid,
+                BattleAnswerResponse.user_id == battle.challenger_id
+            )
+        )
         
-        opponent_answered = db.query(BattleAnswerResponse).filter(
-            BattleAnswerResponse.battle_id == validate_battle_uuid(answer_request.battle_id),
-            BattleAnswerResponse.question_id == question_uuid,
-            BattleAnswerResponse.user_id == battle.opponent_id
-        ).first()
+        opponent_answered = await db.scalar(
+            select(BattleAnswerResponse).where(
+                BattleAnswerResponse.battle_id == validate_battle_uuid(answer_request.battle_id),
+                BattleAnswerResponse.question_id == question_uuid,
+                BattleAnswerResponse.user_id == battle.opponent_id
+            )
+        )
         
         both_answered = challenger_answered is not None and opponent_answered is not None
         
@@ -441,38 +455,75 @@ async def submit_answer(answer_request: SubmitAnswerRequest, current_user: User,
         }
         
     except HTTPException:
-        db.rollback()
+        await db.rollback()
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(500, str(e))
 
-async def get_my_battles(current_user: User, db: Session) -> List[BattleResponse]:
-    """Get all battles for current user"""
-    battles = db.query(Battle).options(
+async def get_my_battles(
+    current_user: Principal,
+    db: AsyncSession,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None
+) -> Tuple[List[BattleResponse], Optional[str]]:
+    """Get the current user's battles and the cursor for the next page"""
+    query = select(Battle).options(
         joinedload(Battle.challenger),
         joinedload(Battle.opponent),
         joinedload(Battle.class_folder)
-    ).filter(
-        (Battle.challenger_id == current_user.id) | (Battle.opponent_id == current_user.id)
-    ).order_by(Battle.created_at.desc()).all()
+    )
+    
+    if not is_paginated(limit, cursor):
+        battles = (await db.scalars(
+            query.where(
+                (Battle.challenger_id == current_user.id) | (Battle.opponent_id == current_user.id)
+            ).order_by(Battle.created_at.desc())
+        )).all()
+        next_cursor = None
+    else:
+        limit = limit or DEFAULT_PAGE_SIZE
+        # An OR across both sides can't be read in index order, so page each side
+        # on its own (created_at, id) index and merge the two short lists
+        sides = [
+            keyset_page(
+                select(Battle.id, Battle.created_at).where(participant == current_user.id),
+                Battle.created_at, Battle.id, limit, cursor
+            ).subquery()
+            for participant in (Battle.challenger_id, Battle.opponent_id)
+        ]
+        candidates = union_all(*(select(side.c.id, side.c.created_at) for side in sides)).subquery()
+        page_ids = select(candidates.c.id).order_by(
+            candidates.c.created_at.desc(), candidates.c.id.desc()
+        ).limit(limit + 1)
+        rows = (await db.scalars(
+            query.where(Battle.id.in_(page_ids)).order_by(Battle.created_at.desc(), Battle.id.desc())
+        )).all()
+        battles, next_cursor = split_page(rows, limit)
     
     return [create_battle_response(battle, battle.challenger, battle.opponent, battle.class_folder) 
-            for battle in battles]
+            for battle in battles], next_cursor
 
-async def get_battle_questions(battle_id: str, current_user: User, db: Session):
+async def get_battle_questions(battle_id: str, current_user: Principal, db: AsyncSession):
     """Get questions for a specific battle"""
-    battle = get_battle_with_validation(battle_id, current_user, db)
+    battle = await get_battle_with_validation(battle_id, current_user, db)
     
-    questions = db.query(Question).options(
-        joinedload(Question.options)
-    ).filter(
-        Question.class_folder_id == battle.class_folder_id
-    ).all()
+    questions = (await db.scalars(
+        select(Question).options(
+            selectinload(Question.options)
+        ).where(
+            Question.class_folder_id == battle.class_folder_id
+        )
+    )).all()
     
-    # Random selection with battle ID as seed for consistency
-    random.seed(str(battle.id))
-    selected = random.sample(questions, min(battle.total_questions, len(questions)))
+    # Sampling and serializing a large folder is CPU work; do it off the event loop
+    return await run_blocking(select_battle_questions, battle_id, battle, questions)
+
+def select_battle_questions(battle_id: str, battle: Battle, questions: List[Question]) -> dict:
+    """Pick and serialize the battle's questions, seeded by battle ID for consistency"""
+    # A private generator: the shared random module isn't safe to reseed across threads
+    rng = random.Random(str(battle.id))
+    selected = rng.sample(questions, min(battle.total_questions, len(questions)))
     
     return {
         "battle_id": battle_id,
@@ -489,22 +540,26 @@ async def get_battle_questions(battle_id: str, current_user: User, db: Session):
         ]
     }
 
-async def get_battle_results(battle_id: str, current_user: User, db: Session):
+async def get_battle_results(battle_id: str, current_user: Principal, db: AsyncSession):
     """Get detailed battle results with comprehensive statistics"""
-    battle = get_battle_with_validation(battle_id, current_user, db)
+    battle = await get_battle_with_validation(battle_id, current_user, db)
     
-    challenger = db.query(User).filter(User.id == battle.challenger_id).first()
-    opponent = db.query(User).filter(User.id == battle.opponent_id).first()
+    challenger = await db.scalar(select(User).where(User.id == battle.challenger_id))
+    opponent = await db.scalar(select(User).where(User.id == battle.opponent_id))
     
-    challenger_answers = db.query(BattleAnswerResponse).filter(
-        BattleAnswerResponse.battle_id == battle.id,
-        BattleAnswerResponse.user_id == battle.challenger_id
-    ).all()
+    challenger_answers = (await db.scalars(
+        select(BattleAnswerResponse).where(
+            BattleAnswerResponse.battle_id == battle.id,
+            BattleAnswerResponse.user_id == battle.challenger_id
+        )
+    )).all()
     
-    opponent_answers = db.query(BattleAnswerResponse).filter(
-        BattleAnswerResponse.battle_id == battle.id,
-        BattleAnswerResponse.user_id == battle.opponent_id
-    ).all()
+    opponent_answers = (await db.scalars(
+        select(BattleAnswerResponse).where(
+            BattleAnswerResponse.battle_id == battle.id,
+            BattleAnswerResponse.user_id == battle.opponent_id
+        )
+    )).all()
     
     # Calculate detailed statistics
     challenger_correct = len([a for a in challenger_answers if a.is_correct])
@@ -562,13 +617,15 @@ async def get_battle_results(battle_id: str, current_user: User, db: Session):
         "started_at": battle.started_at.isoformat() if battle.started_at else None
     }
 
-async def get_battle_by_id(battle_id: str, current_user: User, db: Session) -> BattleResponse:
+async def get_battle_by_id(battle_id: str, current_user: Principal, db: AsyncSession) -> BattleResponse:
     """Get a specific battle by ID"""
-    battle = db.query(Battle).options(
-        joinedload(Battle.challenger),
-        joinedload(Battle.opponent),
-        joinedload(Battle.class_folder)
-    ).filter(Battle.id == validate_battle_uuid(battle_id)).first()
+    battle = await db.scalar(
+        select(Battle).options(
+            joinedload(Battle.challenger),
+            joinedload(Battle.opponent),
+            joinedload(Battle.class_folder)
+        ).where(Battle.id == validate_battle_uuid(battle_id))
+    )
 
     if not battle:
         raise HTTPException(404, "Battle not found")
@@ -578,22 +635,26 @@ async def get_battle_by_id(battle_id: str, current_user: User, db: Session) -> B
 
     return create_battle_response(battle, battle.challenger, battle.opponent, battle.class_folder)
 
-async def check_battle_completion(battle_id: str, db: Session):
+async def check_battle_completion(battle_id: str, db: AsyncSession):
     """Check if battle is complete and update status with improved winner determination"""
-    battle = db.query(Battle).filter(Battle.id == validate_battle_uuid(battle_id)).first()
+    battle = await db.scalar(select(Battle).where(Battle.id == validate_battle_uuid(battle_id)))
     if not battle or battle.battle_status != "active":
         return
     
     # Count answers
-    challenger_answers = db.query(BattleAnswerResponse).filter(
-        BattleAnswerResponse.battle_id == battle.id,
-        BattleAnswerResponse.user_id == battle.challenger_id
-    ).count()
+    challenger_answers = await db.scalar(
+        select(func.count()).select_from(BattleAnswerResponse).where(
+            BattleAnswerResponse.battle_id == battle.id,
+            BattleAnswerResponse.user_id == battle.challenger_id
+        )
+    )
     
-    opponent_answers = db.query(BattleAnswerResponse).filter(
-        BattleAnswerResponse.battle_id == battle.id,
-        BattleAnswerResponse.user_id == battle.opponent_id
-    ).count()
+    opponent_answers = await db.scalar(
+        select(func.count()).select_from(BattleAnswerResponse).where(
+            BattleAnswerResponse.battle_id == battle.id,
+            BattleAnswerResponse.user_id == battle.opponent_id
+        )
+    )
     
     # Check completion
     if challenger_answers >= battle.total_questions and opponent_answers >= battle.total_questions:
@@ -601,15 +662,19 @@ async def check_battle_completion(battle_id: str, db: Session):
         battle.completed_at = datetime.utcnow()
         
         # Get detailed statistics for winner determination
-        challenger_responses = db.query(BattleAnswerResponse).filter(
-            BattleAnswerResponse.battle_id == battle.id,
-            BattleAnswerResponse.user_id == battle.challenger_id
-        ).all()
-        
-        opponent_responses = db.query(BattleAnswerResponse).filter(
-            BattleAnswerResponse.battle_id == battle.id,
-            BattleAnswerResponse.user_id == battle.opponent_id
-        ).all()
+        challenger_responses = (await db.scalars(
+            select(BattleAnswerResponse).where(
+                BattleAnswerResponse.battle_id == battle.id,
+                BattleAnswerResponse.user_id == battle.challenger_id
+            )
+        )).all()
+        
+        opponent_responses = (await db.scalars(
+            select(BattleAnswerResponse).where(
+                BattleAnswerResponse.battle_id == battle.id,
+                BattleAnswerResponse.user_id == battle.opponent_id
+            )
+        )).all()
         
         # Calculate additional metrics
         challenger_correct = len([r for r in challenger_responses if r.is_correct])
@@ -649,7 +714,7 @@ async def check_battle_completion(battle_id: str, db: Session):
                     winner_reason = "complete_tie"
         
         battle.winner_id = winner_id
-        db.commit()
+        await db.commit()
         
         # Prepare detailed results
         results = {
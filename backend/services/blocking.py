@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from decouple import config
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# Dedicated pool for synchronous DB and CPU sections of async handlers, kept
+# apart from the default executor so a burst of heavy work can't starve it
+BLOCKING_MAX_WORKERS = int(config('BLOCKING_MAX_WORKERS', default=8))
+# Jobs allowed to wait for a worker before new ones are refused with a 503
+BLOCKING_MAX_QUEUE = int(config('BLOCKING_MAX_QUEUE', default=64))
+
+class BlockingExecutor:
+    """Bounded thread pool that records queue depth and queue wait times"""
+
+    def __init__(self, max_workers: int = BLOCKING_MAX_WORKERS, max_queue: int = BLOCKING_MAX_QUEUE, name: str = "blocking"):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.max_wait_ms = 0.0
+        self.recent_waits_ms = deque(maxlen=1000)
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run func(*args, **kwargs) on the pool and await its result"""
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                logger.warning(f"{self.name} executor queue full ({self.queued} waiting), rejecting {func.__name__}")
+                raise HTTPException(503, "Server is busy, please retry shortly")
+            self.queued += 1
+        submitted_at = time.perf_counter()
+        started = False
+
+        def call():
+            nonlocal started
+            wait_ms = (time.perf_counter() - submitted_at) * 1000
+            with self._lock:
+                if not started:
+                    started = True
+                    self.queued -= 1
+                self.running += 1
+                self.recent_waits_ms.append(wait_ms)
+                self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                with self._lock:
+                    self.failed += 1
+                raise
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+            return result
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, call)
+        finally:
+            # A caller cancelled before its job started leaves a job that never runs
+            with self._lock:
+                if not started:
+                    started = True
+                    self.queued -= 1
+
+    def get_metrics(self) -> dict:
+        """Queue depth, utilisation and wait-time percentiles for monitoring"""
+        with self._lock:
+            waits = sorted(self.recent_waits_ms)
+            metrics = {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "max_wait_ms": round(self.max_wait_ms, 2),
+            }
+        if waits:
+            metrics["wait_ms_p50"] = round(waits[len(waits) // 2], 2)
+            metrics["wait_ms_p95"] = round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 2)
+        return metrics
+
+blocking_executor = BlockingExecutor()
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """Run a synchronous DB or CPU-bound section off the event loop"""
+    return await blocking_executor.run(func, *args, **kwargs)
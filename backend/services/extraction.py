@@ -0,0 +1,178 @@
+import asyncio
+import signal
+from typing import Awaitable, Callable, List, Optional
+
+from decouple import config
+from fastapi import HTTPException
+
+from .blocking import run_blocking
+from .extraction_cache import page_ocr_cache
+from .process_pool import BoundedProcessPool
+
+# Worker processes for PDF, OCR and DOCX extraction, kept apart from the
+# request threads so a scanned upload can't stall live battles
+EXTRACTION_WORKERS = int(config('EXTRACTION_WORKERS', default=2))
+# Uploads allowed to wait for a worker before new ones get a 503
+EXTRACTION_MAX_QUEUE = int(config('EXTRACTION_MAX_QUEUE', default=8))
+# Longest a single file may take to extract before the upload fails with a 504
+EXTRACTION_TIMEOUT_SECONDS = int(config('EXTRACTION_TIMEOUT_SECONDS', default=300))
+# Scanned PDF pages being OCRed at once, across all uploads in this API process
+OCR_MAX_CONCURRENT_PAGES = int(config('OCR_MAX_CONCURRENT_PAGES', default=EXTRACTION_WORKERS * 2))
+# Extra time the API waits past the worker's own deadline before giving up on it
+EXTRACTION_TIMEOUT_GRACE_SECONDS = 10
+
+PDF_CONTENT_TYPE = 'application/pdf'
+
+# Called with (pages done, total pages) as a PDF is extracted
+PageProgress = Callable[[int, int], Awaitable[None]]
+
+
+class ExtractionError(Exception):
+    """Picklable stand-in for an HTTPException raised inside a worker"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _raise_timeout(signum, frame):
+    raise ExtractionError(504, "Extraction timed out")
+
+
+def _call_processor(timeout_seconds: int, method: str, *args):
+    """Runs in the worker: call a NoteProcessor method under a deadline"""
+    from .note_processor import NoteProcessor
+    # Interrupt the job from inside the worker so the process can be reused
+    use_alarm = hasattr(signal, "SIGALRM")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.alarm(timeout_seconds)
+    try:
+        return getattr(NoteProcessor(), method)(*args)
+    except HTTPException as e:
+        # HTTPException doesn't survive pickling back to the API process
+        raise ExtractionError(e.status_code, e.detail)
+    finally:
+        if use_alarm:
+            signal.alarm(0)
+
+
+class ExtractionService(BoundedProcessPool):
+    """Process pool that turns spooled uploads into cleaned note text"""
+
+    def __init__(
+        self,
+        max_workers: int = EXTRACTION_WORKERS,
+        max_queue: int = EXTRACTION_MAX_QUEUE,
+        timeout_seconds: int = EXTRACTION_TIMEOUT_SECONDS,
+        max_concurrent_pages: int = OCR_MAX_CONCURRENT_PAGES
+    ):
+        super().__init__("extraction", max_workers, max_queue, timeout_seconds + EXTRACTION_TIMEOUT_GRACE_SECONDS)
+        self.job_timeout_seconds = timeout_seconds
+        self.max_concurrent_pages = max_concurrent_pages
+        # Made on the serving loop: before 3.10 a semaphore binds to the loop current at creation
+        self._page_slots: Optional[asyncio.Semaphore] = None
+        self.pages_ocred = 0
+        self.pages_text_layer = 0
+        self.pages_ocr_cached = 0
+        self.pages_in_flight = 0
+
+    def start(self):
+        self._page_slots = asyncio.Semaphore(self.max_concurrent_pages)
+        super().start()
+
+    async def _call(self, method: str, *args, admit: bool = True):
+        try:
+            return await self.run(_call_processor, self.job_timeout_seconds, method, *args, admit=admit)
+        except ExtractionError as e:
+            if e.status_code == 504:
+                self.timed_out += 1
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    async def extract(self, content_type: str, file_path: str, progress: Optional[PageProgress] = None) -> str:
+        """Extracted, cleaned text for a file on disk; the file must outlive the call"""
+        if content_type != PDF_CONTENT_TYPE:
+            return await self._call("_extract_and_clean", content_type, file_path)
+        try:
+            return await asyncio.wait_for(self._extract_pdf(file_path, progress), self.job_timeout_seconds)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise HTTPException(status_code=504, detail="Extraction timed out")
+
+    async def _extract_pdf(self, file_path: str, progress: Optional[PageProgress] = None) -> str:
+        try:
+            # Pages with a usable text layer keep it; only image-only pages are OCRed
+            page_texts = await self._call("_pdf_page_texts", file_path)
+            scanned = [page_number for page_number, text in enumerate(page_texts) if text is None]
+            self.pages_text_layer += len(page_texts) - len(scanned)
+            if progress is not None:
+                await progress(len(page_texts) - len(scanned), len(page_texts))
+            if scanned:
+                ocr_texts = await self._ocr_pages(file_path, scanned, len(page_texts), progress)
+                for page_number, text in zip(scanned, ocr_texts):
+                    page_texts[page_number] = text
+                if page_ocr_cache.claim_sweep():
+                    await run_blocking(page_ocr_cache.sweep)
+            text = "\n".join(page_texts)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"PDF processing error: {str(e)}")
+        # Already admitted; the follow-up jobs of an upload are never refused
+        return await self._call("_clean_notes", text, admit=False)
+
+    async def _ocr_pages(
+        self,
+        file_path: str,
+        page_numbers: List[int],
+        page_count: int,
+        progress: Optional[PageProgress] = None
+    ) -> List[str]:
+        """OCR the given pages across the pool, returned in the same order"""
+        done = page_count - len(page_numbers)
+
+        async def ocr_page(page_number: int) -> str:
+            nonlocal done
+            text = await self._ocr_page(file_path, page_number)
+            done += 1
+            if progress is not None:
+                await progress(done, page_count)
+            return text
+
+        tasks = [asyncio.ensure_future(ocr_page(page_number)) for page_number in page_numbers]
+        try:
+            return await asyncio.gather(*tasks)
+        finally:
+            # One failed page fails the file; don't leave its siblings queued for a slot
+            for task in tasks:
+                task.cancel()
+
+    async def _ocr_page(self, file_path: str, page_number: int) -> str:
+        if self._page_slots is None:
+            self._page_slots = asyncio.Semaphore(self.max_concurrent_pages)  # Used without start()
+        async with self._page_slots:
+            self.pages_in_flight += 1
+            try:
+                text, from_cache = await self._call("_ocr_pdf_page", file_path, page_number, admit=False)
+            finally:
+                self.pages_in_flight -= 1
+        if from_cache:
+            self.pages_ocr_cached += 1
+        else:
+            self.pages_ocred += 1
+        return text
+
+    def get_metrics(self) -> dict:
+        metrics = super().get_metrics()
+        metrics.update({
+            "max_concurrent_pages": self.max_concurrent_pages,
+            "pages_in_flight": self.pages_in_flight,
+            "pages_ocred": self.pages_ocred,
+            "pages_text_layer": self.pages_text_layer,
+            "pages_ocr_cached": self.pages_ocr_cached,
+        })
+        return metrics
+
+
+extraction_service = ExtractionService()
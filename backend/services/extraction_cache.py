@@ -0,0 +1,268 @@
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from decouple import config
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+
+from database import SessionLocal
+from models import ExtractionCacheEntry
+from .blocking import run_blocking
+
+logger = logging.getLogger(__name__)
+
+# Reuse cleaned text for byte-identical uploads instead of extracting them again
+EXTRACTION_CACHE_ENABLED = config('EXTRACTION_CACHE_ENABLED', default=True, cast=bool)
+EXTRACTION_CACHE_DIR = config(
+    'EXTRACTION_CACHE_DIR',
+    default=os.path.join(tempfile.gettempdir(), 'brainduel-extraction-cache')
+)
+# Cached text kept on disk; least recently used files go first past this
+EXTRACTION_CACHE_MAX_BYTES = int(config('EXTRACTION_CACHE_MAX_BYTES', default=512 * 1024 * 1024))
+# Bump when extraction or cleaning changes, so text produced by older code is re-extracted
+EXTRACTOR_VERSION = 1
+# Index rows examined per eviction query
+EVICTION_BATCH_SIZE = 100
+
+# Reuse OCR text for pages that render to the same pixels, e.g. unchanged slides in a revised deck
+OCR_PAGE_CACHE_ENABLED = config('OCR_PAGE_CACHE_ENABLED', default=True, cast=bool)
+# OCR text kept per API host before the least recently used pages are removed
+OCR_PAGE_CACHE_MAX_BYTES = int(config('OCR_PAGE_CACHE_MAX_BYTES', default=256 * 1024 * 1024))
+# Minimum time between size sweeps of the page cache directory
+OCR_PAGE_CACHE_SWEEP_SECONDS = 300
+
+
+def _write_atomic(path: str, data: bytes):
+    """Write then rename, so readers never see a partial file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # A unique temp name per call; pid alone collides between threads of one worker
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix='.tmp', delete=False) as f:
+        temp_path = f.name
+        try:
+            f.write(data)
+        except BaseException:
+            f.close()
+            os.unlink(temp_path)
+            raise
+    try:
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class ExtractionCache:
+    """Content-addressed store of cleaned extraction output, indexed in extraction_cache"""
+
+    def __init__(self, directory: str = EXTRACTION_CACHE_DIR, max_bytes: int = EXTRACTION_CACHE_MAX_BYTES, enabled: bool = EXTRACTION_CACHE_ENABLED):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def _path(self, sha256: str) -> str:
+        # Two-character fan-out keeps directories small
+        return os.path.join(self.directory, sha256[:2], f"{sha256}.txt")
+
+    def _remove_file(self, sha256: str):
+        try:
+            os.unlink(self._path(sha256))
+        except FileNotFoundError:
+            pass
+
+    def _lookup(self, sha256: str, content_type: str) -> Optional[str]:
+        db = SessionLocal()
+        try:
+            entry = db.get(ExtractionCacheEntry, sha256)
+            if entry is None or entry.content_type != content_type or entry.extractor_version != EXTRACTOR_VERSION:
+                return None
+            try:
+                with open(self._path(sha256), encoding='utf-8') as f:
+                    text = f.read()
+            except FileNotFoundError:
+                return None  # Indexed by another host, or removed by hand; the next store rewrites it
+            entry.hits = ExtractionCacheEntry.hits + 1
+            entry.last_used_at = datetime.now(timezone.utc)
+            db.commit()
+            return text
+        finally:
+            db.close()
+
+    def _store(self, sha256: str, content_type: str, source_size: int, text: str):
+        data = text.encode('utf-8')
+        _write_atomic(self._path(sha256), data)
+        db = SessionLocal()
+        try:
+            entry = db.get(ExtractionCacheEntry, sha256) or ExtractionCacheEntry(sha256=sha256, hits=0)
+            entry.content_type = content_type
+            entry.extractor_version = EXTRACTOR_VERSION
+            entry.source_size = source_size
+            entry.text_size = len(data)
+            entry.last_used_at = datetime.now(timezone.utc)
+            db.add(entry)
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()  # A concurrent upload of the same file indexed it first
+            self._evict(db)
+        finally:
+            db.close()
+
+    def _evict(self, db):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        total = db.scalar(select(func.coalesce(func.sum(ExtractionCacheEntry.text_size), 0)))
+        while total > self.max_bytes:
+            oldest = db.scalars(
+                select(ExtractionCacheEntry).order_by(ExtractionCacheEntry.last_used_at).limit(EVICTION_BATCH_SIZE)
+            ).all()
+            if not oldest:
+                return
+            for entry in oldest:
+                if total <= self.max_bytes:
+                    break
+                self._remove_file(entry.sha256)
+                db.delete(entry)
+                total -= entry.text_size
+                self.evictions += 1
+            db.commit()
+
+    async def get(self, sha256: str, content_type: str) -> Optional[str]:
+        """Cached text for an upload's content, or None"""
+        if not self.enabled:
+            return None
+        try:
+            text = await run_blocking(self._lookup, sha256, content_type)
+        except Exception as e:
+            # The cache is an optimisation; never fail an upload over it
+            self.errors += 1
+            logger.warning(f"Extraction cache lookup failed for {sha256}: {e}")
+            return None
+        if text is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return text
+
+    async def put(self, sha256: str, content_type: str, source_size: int, text: str):
+        """Remember the cleaned text extracted from an upload's content"""
+        if not self.enabled:
+            return
+        try:
+            await run_blocking(self._store, sha256, content_type, source_size, text)
+            self.stores += 1
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Extraction cache store failed for {sha256}: {e}")
+
+    def get_metrics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "directory": self.directory,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "pages": page_ocr_cache.get_metrics(),
+        }
+
+
+extraction_cache = ExtractionCache()
+
+
+class PageOcrCache:
+    """OCR text per rendered page, keyed by the SHA-256 of its pixels"""
+    # Read and written from extraction workers, which hold no database
+    # connections, so recency is the file's mtime rather than an index row
+
+    def __init__(
+        self,
+        directory: str = os.path.join(EXTRACTION_CACHE_DIR, 'pages'),
+        max_bytes: int = OCR_PAGE_CACHE_MAX_BYTES,
+        enabled: bool = OCR_PAGE_CACHE_ENABLED
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.last_sweep = 0.0
+        self.sweeps = 0
+        self.evictions = 0
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], f"{digest}.txt")
+
+    def get(self, digest: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        path = self._path(digest)
+        try:
+            with open(path, encoding='utf-8') as f:
+                text = f.read()
+            os.utime(path)  # Mark as recently used for the sweep
+            return text
+        except OSError:
+            return None
+
+    def put(self, digest: str, text: str):
+        if not self.enabled:
+            return
+        try:
+            _write_atomic(self._path(digest), text.encode('utf-8'))
+        except OSError as e:
+            logger.warning(f"Page OCR cache store failed for {digest}: {e}")
+
+    def sweep(self) -> int:
+        """Remove least recently used pages until the directory fits in max_bytes"""
+        self.sweeps += 1
+        files = []
+        total = 0
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        evicted = 0
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        self.evictions += evicted
+        return evicted
+
+    def claim_sweep(self) -> bool:
+        """True at most once per sweep interval, for the caller that should run it"""
+        if not self.enabled or time.monotonic() - self.last_sweep < OCR_PAGE_CACHE_SWEEP_SECONDS:
+            return False
+        self.last_sweep = time.monotonic()
+        return True
+
+    def get_metrics(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "max_bytes": self.max_bytes,
+            "sweeps": self.sweeps,
+            "evictions": self.evictions,
+        }
+
+
+page_ocr_cache = PageOcrCache()
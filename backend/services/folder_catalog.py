@@ -0,0 +1,219 @@
+import asyncio
+import bisect
+import logging
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from decouple import config
+from sqlalchemy import select
+
+from database import AsyncSessionLocal
+from models import ClassFolder
+from schemas import FolderResponse
+from .pagination import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor, is_paginated
+
+logger = logging.getLogger(__name__)
+
+# Full reload interval, picking up folders written by other workers or outside the API
+CATALOG_REFRESH_SECONDS = int(config('CATALOG_REFRESH_SECONDS', default=60))
+# Entries listed per facet in /folders/public/facets
+CATALOG_MAX_FACET_VALUES = int(config('CATALOG_MAX_FACET_VALUES', default=50))
+# Distinct filter/page combinations whose encoded bodies are kept between changes
+CATALOG_MAX_CACHED_BODIES = 256
+
+
+class CatalogEntry:
+    """A public folder's filter fields plus its response, serialized once"""
+    __slots__ = ("key", "university_name", "course_code", "name_lower", "university_lower", "json")
+
+    def __init__(self, folder: ClassFolder):
+        self.key: Tuple[datetime, uuid.UUID] = (folder.created_at, folder.id)
+        self.university_name = folder.university_name
+        self.course_code = folder.course_code
+        self.name_lower = (folder.name or "").lower()
+        self.university_lower = (folder.university_name or "").lower()
+        self.json = FolderResponse.from_orm(folder).model_dump_json()
+
+
+class PublicFolderCatalog:
+    """In-memory snapshot of public folders with facet counts, kept current by folder writes"""
+
+    def __init__(self):
+        # Made on first use: before 3.10 a lock binds to the loop current at creation
+        self._load_lock: Optional[asyncio.Lock] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.loaded_at: Optional[float] = None
+        self.version = 0
+        self.entries: Dict[uuid.UUID, CatalogEntry] = {}
+        self.keys: List[Tuple[datetime, uuid.UUID]] = []  # ascending; listings walk it backwards
+        self.universities: Counter = Counter()
+        self.course_codes: Counter = Counter()
+        # Encoded (body, next cursor) per distinct request, for the current version
+        self._encoded: Dict[tuple, Tuple[bytes, Optional[str]]] = {}
+        self.hits = 0
+        self.reloads = 0
+        # Upserts made while a reload reads the database, replayed onto its result
+        self._pending: Optional[List[Tuple[uuid.UUID, Optional[CatalogEntry]]]] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    def _changed(self):
+        self.version += 1
+        self._encoded.clear()
+
+    def upsert(self, folder: ClassFolder):
+        """Add, replace or drop a folder after it was created or changed"""
+        if not self.loaded:
+            return  # The first load reads it from the database
+        entry = CatalogEntry(folder) if folder.is_public else None
+        if self._pending is not None:
+            self._pending.append((folder.id, entry))
+        self._apply(folder.id, entry)
+        self._changed()
+
+    def _apply(self, folder_id: uuid.UUID, entry: Optional[CatalogEntry]):
+        self._discard(folder_id)
+        if entry is not None:
+            self._insert(entry)
+
+    def _insert(self, entry: CatalogEntry):
+        self.entries[entry.key[1]] = entry
+        bisect.insort(self.keys, entry.key)
+        if entry.university_name:
+            self.universities[entry.university_name] += 1
+        if entry.course_code:
+            self.course_codes[entry.course_code] += 1
+
+    def _discard(self, folder_id: uuid.UUID):
+        entry = self.entries.pop(folder_id, None)
+        if entry is None:
+            return
+        self.keys.pop(bisect.bisect_left(self.keys, entry.key))
+        for counter, value in ((self.universities, entry.university_name), (self.course_codes, entry.course_code)):
+            if value:
+                counter[value] -= 1
+                if counter[value] <= 0:
+                    del counter[value]
+
+    async def reload(self):
+        """Rebuild the snapshot from the database and swap it in"""
+        self._pending = []
+        try:
+            async with AsyncSessionLocal() as db:
+                folders = (await db.scalars(select(ClassFolder).where(ClassFolder.is_public == True))).all()
+            fresh = PublicFolderCatalog()
+            for folder in folders:
+                fresh._insert(CatalogEntry(folder))
+            # Writes that landed after the query may be missing from its result
+            for folder_id, entry in self._pending:
+                fresh._apply(folder_id, entry)
+        finally:
+            self._pending = None
+        self.entries, self.keys = fresh.entries, fresh.keys
+        self.universities, self.course_codes = fresh.universities, fresh.course_codes
+        self.loaded_at = time.monotonic()
+        self.reloads += 1
+        self._changed()
+
+    async def _refresh_in_background(self):
+        try:
+            await self.reload()
+        except Exception as e:
+            logger.warning(f"Public folder catalog refresh failed: {e}")
+        finally:
+            self._refresh_task = None
+
+    async def ensure_fresh(self):
+        """Load on first use; afterwards refresh in the background once stale"""
+        if not self.loaded:
+            if self._load_lock is None:
+                self._load_lock = asyncio.Lock()
+            async with self._load_lock:
+                if not self.loaded:
+                    await self.reload()
+            return
+        if time.monotonic() - self.loaded_at > CATALOG_REFRESH_SECONDS and self._refresh_task is None:
+            # Keep serving the current snapshot while the new one loads
+            self._refresh_task = asyncio.create_task(self._refresh_in_background())
+
+    def _matching_keys(self, university: Optional[str], course: Optional[str], after=None):
+        """Newest-first keys older than after, filtered like the old ILIKE '%...%' query"""
+        university = university.lower() if university else None
+        course = course.lower() if course else None
+        end = bisect.bisect_left(self.keys, after) if after else len(self.keys)
+        for index in range(end - 1, -1, -1):
+            key = self.keys[index]
+            entry = self.entries[key[1]]
+            if university and university not in entry.university_lower:
+                continue
+            if course and course not in entry.name_lower:
+                continue
+            yield key
+
+    async def list_public(
+        self,
+        university: Optional[str] = None,
+        course: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Tuple[bytes, Optional[str]]:
+        """JSON body for a /folders/public request and the next page's cursor"""
+        await self.ensure_fresh()
+        self.hits += 1
+        cache_key = (university, course, limit, cursor)
+        cached = self._encoded.get(cache_key)
+        if cached is not None:
+            return cached
+        next_cursor = None
+        if not is_paginated(limit, cursor):
+            keys = list(self._matching_keys(university, course))
+        else:
+            limit = limit or DEFAULT_PAGE_SIZE
+            keys = self._matching_keys(university, course, decode_cursor(cursor) if cursor else None)
+            page = []
+            for key in keys:
+                if len(page) == limit:
+                    next_cursor = encode_cursor(*page[-1])
+                    break
+                page.append(key)
+            keys = page
+        body = ("[" + ",".join(self.entries[key[1]].json for key in keys) + "]").encode()
+        if len(self._encoded) >= CATALOG_MAX_CACHED_BODIES:
+            self._encoded.clear()
+        self._encoded[cache_key] = (body, next_cursor)
+        return body, next_cursor
+
+    async def facets(self) -> dict:
+        """Public folder counts by university and by course code"""
+        await self.ensure_fresh()
+        self.hits += 1
+        return {
+            "total": len(self.entries),
+            "universities": [
+                {"value": value, "count": count}
+                for value, count in self.universities.most_common(CATALOG_MAX_FACET_VALUES)
+            ],
+            "course_codes": [
+                {"value": value, "count": count}
+                for value, count in self.course_codes.most_common(CATALOG_MAX_FACET_VALUES)
+            ],
+        }
+
+    def get_metrics(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "folders": len(self.entries),
+            "version": self.version,
+            "reloads": self.reloads,
+            "hits": self.hits,
+            "age_seconds": round(time.monotonic() - self.loaded_at, 1) if self.loaded else None,
+            "cached_bodies": len(self._encoded),
+        }
+
+
+public_folder_catalog = PublicFolderCatalog()
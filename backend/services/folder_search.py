@@ -0,0 +1,233 @@
+import asyncio
+import bisect
+import logging
+import re
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, literal_column, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import AsyncSessionLocal
+from models import ClassFolder
+from models.education import FOLDER_SEARCH_DOCUMENT
+from .folder_catalog import CATALOG_REFRESH_SECONDS
+from .pagination import decode_rank_cursor, encode_rank_cursor
+
+logger = logging.getLogger(__name__)
+
+# Field weights, matching ts_rank's defaults for the A/B/C labels in FOLDER_SEARCH_DOCUMENT
+SEARCH_FIELD_WEIGHTS = {
+    "name": 1.0,
+    "course_code": 1.0,
+    "university_name": 0.4,
+    "description": 0.2,
+}
+# Search terms beyond this are ignored
+MAX_SEARCH_TERMS = 8
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercased word tokens, split the same way for documents and queries"""
+    return _TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+class FolderSearchIndex:
+    """In-process inverted index over public folders, used where tsvector isn't available"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Made on first use: before 3.10 a lock binds to the loop current at creation
+        self._load_lock: Optional[asyncio.Lock] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.loaded_at: Optional[float] = None
+        self.reloads = 0
+        # token -> {folder id: best field weight for that token}
+        self.postings: Dict[str, Dict[uuid.UUID, float]] = {}
+        # Sorted vocabulary, so a prefix maps to a contiguous slice
+        self.vocabulary: List[str] = []
+        self.documents: Dict[uuid.UUID, List[str]] = {}
+        # Changes made while a reload reads the database, replayed onto its result
+        self._pending: Optional[List[Tuple[uuid.UUID, Optional[Dict[str, float]]]]] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    def add_folder(self, folder: ClassFolder):
+        """Index (or re-index) a folder's searchable fields"""
+        weights: Dict[str, float] = {}
+        for field, weight in SEARCH_FIELD_WEIGHTS.items():
+            for token in tokenize(getattr(folder, field)):
+                weights[token] = max(weights.get(token, 0.0), weight)
+        with self._lock:
+            self._apply(folder.id, weights)
+
+    def remove_folder(self, folder_id: uuid.UUID):
+        with self._lock:
+            self._apply(folder_id, None)
+
+    def _apply(self, folder_id: uuid.UUID, weights: Optional[Dict[str, float]]):
+        if self._pending is not None:
+            self._pending.append((folder_id, weights))
+        self._remove(folder_id)
+        for token, weight in (weights or {}).items():
+            if token not in self.postings:
+                self.postings[token] = {}
+                bisect.insort(self.vocabulary, token)
+            self.postings[token][folder_id] = weight
+        if weights is not None:
+            self.documents[folder_id] = list(weights)
+
+    def _remove(self, folder_id: uuid.UUID):
+        for token in self.documents.pop(folder_id, []):
+            postings = self.postings.get(token)
+            if postings is not None:
+                postings.pop(folder_id, None)
+                if not postings:
+                    del self.postings[token]
+                    self.vocabulary.pop(bisect.bisect_left(self.vocabulary, token))
+
+    def _prefix_scores(self, term: str) -> Dict[uuid.UUID, float]:
+        """Best weight per folder over every indexed token starting with term"""
+        scores: Dict[uuid.UUID, float] = {}
+        start = bisect.bisect_left(self.vocabulary, term)
+        for token in self.vocabulary[start:]:
+            if not token.startswith(term):
+                break
+            for folder_id, weight in self.postings[token].items():
+                if weight > scores.get(folder_id, 0.0):
+                    scores[folder_id] = weight
+        return scores
+
+    def search(self, terms: List[str], limit: int, after: Optional[Tuple[float, uuid.UUID]] = None) -> List[Tuple[float, uuid.UUID]]:
+        """(score, folder id) pairs matching every term as a prefix, best first"""
+        with self._lock:
+            scores: Optional[Dict[uuid.UUID, float]] = None
+            for term in terms:
+                term_scores = self._prefix_scores(term)
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {
+                        folder_id: score + term_scores[folder_id]
+                        for folder_id, score in scores.items() if folder_id in term_scores
+                    }
+                if not scores:
+                    return []
+        ranked = sorted(((score, folder_id) for folder_id, score in scores.items()), reverse=True)
+        if after is not None:
+            ranked = [entry for entry in ranked if entry < after]
+        return ranked[:limit + 1]
+
+    async def reload(self):
+        """Rebuild the index from the database and swap it in"""
+        with self._lock:
+            self._pending = []
+        try:
+            async with AsyncSessionLocal() as db:
+                folders = (await db.scalars(select(ClassFolder).where(ClassFolder.is_public == True))).all()
+            fresh = FolderSearchIndex()
+            for folder in folders:
+                fresh.add_folder(folder)
+            with self._lock:
+                self.postings, self.vocabulary, self.documents = fresh.postings, fresh.vocabulary, fresh.documents
+                pending, self._pending = self._pending, None
+                # Writes that landed after the query may be missing from its result
+                for folder_id, weights in pending:
+                    self._apply(folder_id, weights)
+        finally:
+            with self._lock:
+                self._pending = None
+        self.loaded_at = time.monotonic()
+        self.reloads += 1
+
+    async def _refresh_in_background(self):
+        try:
+            await self.reload()
+        except Exception as e:
+            logger.warning(f"Folder search index refresh failed: {e}")
+        finally:
+            self._refresh_task = None
+
+    async def ensure_fresh(self):
+        """Build on first use; afterwards refresh in the background once stale, like the public catalog"""
+        if not self.loaded:
+            if self._load_lock is None:
+                self._load_lock = asyncio.Lock()
+            async with self._load_lock:
+                if not self.loaded:
+                    await self.reload()
+            return
+        if time.monotonic() - self.loaded_at > CATALOG_REFRESH_SECONDS and self._refresh_task is None:
+            # Other workers' writes only reach this index through a reload
+            self._refresh_task = asyncio.create_task(self._refresh_in_background())
+
+
+folder_search_index = FolderSearchIndex()
+
+
+def index_folder(folder: ClassFolder):
+    """Keep the in-process index current after a folder is created or changed"""
+    if not folder_search_index.loaded:
+        return  # Built from the database on first search, which will include it
+    if folder.is_public:
+        folder_search_index.add_folder(folder)
+    else:
+        folder_search_index.remove_folder(folder.id)
+
+
+async def _search_postgres(terms: List[str], db: AsyncSession, limit: int, cursor: Optional[str]):
+    # Prefix match on every term, so results update as the user types
+    ts_query = func.to_tsquery(literal_column("'simple'"), " & ".join(f"{term}:*" for term in terms))
+    document = literal_column(f"({FOLDER_SEARCH_DOCUMENT})")
+    rank = func.ts_rank(document, ts_query)
+    query = select(ClassFolder, rank).where(
+        ClassFolder.is_public == True,
+        document.op("@@")(ts_query)
+    )
+    if cursor:
+        after_rank, after_id = decode_rank_cursor(cursor)
+        query = query.where(tuple_(rank, ClassFolder.id) < tuple_(after_rank, after_id))
+    rows = (await db.execute(
+        query.order_by(rank.desc(), ClassFolder.id.desc()).limit(limit + 1)
+    )).all()
+    return [(folder, float(score)) for folder, score in rows]
+
+
+async def _search_in_process(terms: List[str], db: AsyncSession, limit: int, cursor: Optional[str]):
+    await folder_search_index.ensure_fresh()
+    after = decode_rank_cursor(cursor) if cursor else None
+    ranked = folder_search_index.search(terms, limit, after)
+    if not ranked:
+        return []
+    folders = (await db.scalars(
+        select(ClassFolder).where(ClassFolder.id.in_([folder_id for _, folder_id in ranked]))
+    )).all()
+    by_id = {folder.id: folder for folder in folders}
+    return [(by_id[folder_id], score) for score, folder_id in ranked if folder_id in by_id]
+
+
+async def search_public_folders(
+    query: str,
+    db: AsyncSession,
+    limit: int,
+    cursor: Optional[str] = None
+) -> Tuple[List[ClassFolder], Optional[str]]:
+    """Public folders matching every word of query, best match first, and the next page's cursor"""
+    terms = tokenize(query)[:MAX_SEARCH_TERMS]
+    if not terms:
+        return [], None
+    if db.bind.dialect.name == "postgresql":
+        results = await _search_postgres(terms, db, limit, cursor)
+    else:
+        results = await _search_in_process(terms, db, limit, cursor)
+    if len(results) <= limit:
+        return [folder for folder, _ in results], None
+    results = results[:limit]
+    last_folder, last_score = results[-1]
+    return [folder for folder, _ in results], encode_rank_cursor(last_score, last_folder.id)
@@ -1,14 +1,18 @@
 from datetime import datetime
-from typing import Optional, List
-from sqlalchemy.orm import Session
+from typing import Optional, List, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from models import ClassFolder
 from schemas import CreateFolderRequest, FolderResponse
 from services.auth import get_current_user
+from services.folder_catalog import public_folder_catalog
+from services.folder_search import index_folder
+from services.pagination import DEFAULT_PAGE_SIZE, is_paginated, keyset_page, split_page
 
 
 async def create_folder(
     folder_data: CreateFolderRequest,
-    db: Session,
+    db: AsyncSession,
     user_id: str
 ):
     """Create a new class folder"""
@@ -22,29 +26,32 @@ async def create_folder(
     )
     
     db.add(folder)
-    db.commit()
-    db.refresh(folder)
+    await db.commit()
+    await db.refresh(folder)
+    index_folder(folder)
+    public_folder_catalog.upsert(folder)
     
     return folder
 
-async def get_public_folders(
-    university: Optional[str],
-    course: Optional[str],
-    db: Session
-):
-    """Get public class folders"""
-    query = db.query(ClassFolder).filter(ClassFolder.is_public == True)
-    
-    if university:
-        query = query.filter(ClassFolder.university_name.ilike(f"%{university}%"))
-    if course:
-        query = query.filter(ClassFolder.name.ilike(f"%{course}%"))
-    
-    return query.all()
+async def fetch_folder_page(
+    query,
+    db: AsyncSession,
+    limit: Optional[int],
+    cursor: Optional[str]
+) -> Tuple[List[ClassFolder], Optional[str]]:
+    """Run a folder query, newest first in keyset pages when a limit or cursor is given"""
+    if not is_paginated(limit, cursor):
+        return (await db.scalars(query)).all(), None
+    limit = limit or DEFAULT_PAGE_SIZE
+    rows = (await db.scalars(keyset_page(query, ClassFolder.created_at, ClassFolder.id, limit, cursor))).all()
+    return split_page(rows, limit)
 
 async def get_my_folders(
-    db: Session,
-    user_id: str
+    db: AsyncSession,
+    user_id: str,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None
 ):
-    """Get current user's folders"""
-    return db.query(ClassFolder).filter(ClassFolder.owner_id == user_id).all()
\ No newline at end of file
+    """Get current user's folders and the cursor for the next page"""
+    query = select(ClassFolder).where(ClassFolder.owner_id == user_id)
+    return await fetch_folder_page(query, db, limit, cursor)
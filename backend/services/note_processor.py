@@ -5,11 +5,23 @@ import io
 import re
 import nltk
 import gc
+import hashlib
 import tempfile
 import os
+from decouple import config
 from fastapi import UploadFile, HTTPException
-from typing import Optional
-import aiofiles
+from typing import List, Optional, Tuple
+
+from .blocking import run_blocking
+from .extraction import PDF_CONTENT_TYPE, PageProgress, extraction_service
+from .extraction_cache import extraction_cache, page_ocr_cache
+
+# Uploads are copied to disk this many bytes at a time
+UPLOAD_CHUNK_SIZE = int(config('UPLOAD_CHUNK_SIZE', default=1024 * 1024))
+# Largest accepted upload; copying stops with a 413 as soon as it is exceeded
+MAX_UPLOAD_BYTES = int(config('MAX_UPLOAD_BYTES', default=50 * 1024 * 1024))
+# A PDF page with images and less text layer than this is treated as scanned and OCRed
+PDF_PAGE_TEXT_MIN_CHARS = 50
 
 # Download punkt only if needed, quietly
 try:
@@ -17,91 +29,158 @@ try:
 except LookupError:
     nltk.download('punkt', quiet=True)
 
+class SpooledUpload:
+    """An upload copied to a temp file, with its size and SHA-256 taken on the way"""
+    __slots__ = ("path", "size", "sha256")
+
+    def __init__(self, path: str, size: int, sha256: str):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+
+
+class ProcessedUpload:
+    """Cleaned text extracted from an upload, plus what was measured while spooling it"""
+    __slots__ = ("text", "size", "sha256")
+
+    def __init__(self, text: str, size: int, sha256: str):
+        self.text = text
+        self.size = size
+        self.sha256 = sha256
+
+
+def _too_large(file: UploadFile, max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"File {file.filename} exceeds the {max_bytes} byte upload limit"
+    )
+
+
+def _hash_and_write(digest, temp_file, chunk: bytes):
+    digest.update(chunk)
+    temp_file.write(chunk)
+
+
+async def spool_upload(file: UploadFile, chunk_size: int = UPLOAD_CHUNK_SIZE, max_bytes: int = MAX_UPLOAD_BYTES) -> SpooledUpload:
+    """Copy an upload to a temp file chunk by chunk; the caller removes the file"""
+    if file.size is not None and file.size > max_bytes:
+        raise _too_large(file, max_bytes)
+    digest = hashlib.sha256()
+    size = 0
+    temp_file = tempfile.NamedTemporaryFile(delete=False)
+    try:
+        with temp_file:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise _too_large(file, max_bytes)
+                # Hashing and writing a chunk can stall on a slow disk; keep them off the event loop
+                await run_blocking(_hash_and_write, digest, temp_file, chunk)
+    except BaseException:
+        os.unlink(temp_file.name)
+        raise
+    return SpooledUpload(temp_file.name, size, digest.hexdigest())
+
+
 class NoteProcessor:
     """Service for processing uploaded files and extracting text content"""
     
     def __init__(self):
+        # Whole-file processors; PDFs are extracted page by page by the extraction service
         self.supported_types = {
-            'application/pdf': self._process_pdf,
             'image/jpeg': self._process_image,
             'image/jpg': self._process_image,
             'image/png': self._process_image,
             'text/plain': self._process_text,
             'application/vnd.openxmlformats-officedocument.wordprocessingml.document': self._process_docx
         }
+        self.pages_from_cache = 0
     
     async def process_file(self, file: UploadFile) -> str:
         """Process uploaded file and return extracted text"""
-        if file.content_type not in self.supported_types:
+        return (await self.process_upload(file)).text
+    
+    def check_supported(self, file: UploadFile):
+        """Reject a file type there is no processor for"""
+        if file.content_type != PDF_CONTENT_TYPE and file.content_type not in self.supported_types:
             raise HTTPException(
                 status_code=400, 
                 detail=f"Unsupported file type: {file.content_type}"
             )
+    
+    async def process_upload(self, file: UploadFile) -> ProcessedUpload:
+        """Process uploaded file, returning its text, size and content hash"""
+        self.check_supported(file)
         
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-            try:
-                # Read and save file content
-                content = await file.read()
-                temp_file.write(content)
-                temp_file.flush()
-                
-                # Process based on file type
-                processor = self.supported_types[file.content_type]
-                extracted_text = await processor(temp_file.name)
-                
-                # Clean the extracted text
-                cleaned_text = self._clean_notes(extracted_text)
-                return cleaned_text
-                
-            finally:
-                # Clean up temp file
-                os.unlink(temp_file.name)
-                await file.seek(0)  # Reset file pointer
-    
-    async def _process_pdf(self, file_path: str) -> str:
-        """Process PDF file - try text extraction first, then OCR if needed"""
+        # Stream to a temp file so only one chunk is in memory at a time
+        spooled = await spool_upload(file)
         try:
-            # First try to extract text directly
-            text = self._extract_pdf_text(file_path)
-            
-            # If no text or very little text, use OCR
-            if not text or len(text.strip()) < 100:
-                text = self._extract_text_from_scanned_pdf(file_path)
-            
+            text = await self.extract_spooled(file.content_type, spooled)
+            return ProcessedUpload(text, spooled.size, spooled.sha256)
+        finally:
+            # Clean up temp file
+            os.unlink(spooled.path)
+            await file.seek(0)  # Reset file pointer
+    
+    async def extract_spooled(self, content_type: str, spooled: SpooledUpload, progress: Optional[PageProgress] = None) -> str:
+        """Cleaned text for an upload already spooled to disk"""
+        # Identical files (the same slides uploaded by a whole class) are extracted once
+        text = await extraction_cache.get(spooled.sha256, content_type)
+        if text is None:
+            # Extraction and cleaning are CPU-bound; run them in the extraction pool
+            text = await extraction_service.extract(content_type, spooled.path, progress)
+            await extraction_cache.put(spooled.sha256, content_type, spooled.size, text)
+        return text
+    
+    def _extract_and_clean(self, content_type: str, file_path: str) -> str:
+        """Extract text with the processor for content_type, then clean it"""
+        processor = self.supported_types[content_type]
+        extracted_text = processor(file_path)
+        return self._clean_notes(extracted_text)
+    
+    def _page_text_layer(self, page) -> Optional[str]:
+        """The page's own text, or None for an image-only page that needs OCR"""
+        text = page.get_text()
+        if len(text.strip()) >= PDF_PAGE_TEXT_MIN_CHARS or not page.get_images():
+            # Pages with no images have nothing more for OCR to find
             return text
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"PDF processing error: {str(e)}")
+        return None
     
-    def _extract_pdf_text(self, file_path: str) -> str:
-        """Extract text directly from PDF (for text-based PDFs)"""
-        text = []
+    def _pdf_page_texts(self, file_path: str) -> List[Optional[str]]:
+        """Text layer of each PDF page in order, None where the page needs OCR"""
         with fitz.open(file_path) as pdf_document:
-            for page in pdf_document:
-                text.append(page.get_text())
-        return "\n".join(text)
+            return [self._page_text_layer(page) for page in pdf_document]
     
-    def _extract_text_from_scanned_pdf(self, file_path: str) -> str:
-        """Extract text from scanned PDF using OCR"""
-        full_text = []
+    def _ocr_pdf_page(self, file_path: str, page_number: int) -> Tuple[str, bool]:
+        """OCR one PDF page rendered from the file, and whether the page OCR cache answered"""
+        # Rendering happens here, in the worker, so no pixmap is pickled
         with fitz.open(file_path) as pdf_document:
-            for page in pdf_document:
-                full_text.append(self._process_page_ocr(page))
-        return "\n".join(full_text)
+            text = self._process_page_ocr(pdf_document[page_number])
+        return text, self.pages_from_cache > 0
     
     def _process_page_ocr(self, page) -> str:
-        """Process a single PDF page with OCR"""
+        """Process a single PDF page with OCR, reusing text for identically rendered pages"""
+        pix = page.get_pixmap()
+        img_bytes = pix.tobytes("ppm")
+        del pix
+        digest = hashlib.sha256(img_bytes).hexdigest()
+        cached = page_ocr_cache.get(digest)
+        if cached is not None:
+            self.pages_from_cache += 1
+            return cached
         try:
-            pix = page.get_pixmap()
-            img_bytes = pix.tobytes("ppm")
             img = Image.open(io.BytesIO(img_bytes)).convert('L')
             text = pytesseract.image_to_string(img, timeout=30)
-            return text
         finally:
-            del pix, img_bytes, img
+            del img_bytes
             gc.collect()
+        page_ocr_cache.put(digest, text)
+        return text
     
-    async def _process_image(self, file_path: str) -> str:
+    def _process_image(self, file_path: str) -> str:
         """Process image file with OCR"""
         try:
             img = Image.open(file_path).convert('L')
@@ -110,15 +189,15 @@ class NoteProcessor:
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Image processing error: {str(e)}")
     
-    async def _process_text(self, file_path: str) -> str:
+    def _process_text(self, file_path: str) -> str:
         """Process plain text file"""
         try:
-            async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
-                return await f.read()
+            with open(file_path, 'r', encoding='utf-8') as f:
+                return f.read()
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Text file processing error: {str(e)}")
     
-    async def _process_docx(self, file_path: str) -> str:
+    def _process_docx(self, file_path: str) -> str:
         """Process Word document"""
         try:
             from docx import Document
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from decouple import config
+
+from database import SessionLocal
+from .blocking import run_blocking
+from .notes_services import delete_expired_notes, NOTE_CLEANUP_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Background removal of expired temp notes, in place of calling DELETE /notes/cleanup-expired
+NOTE_REAPER_ENABLED = config('NOTE_REAPER_ENABLED', default=True, cast=bool)
+NOTE_REAPER_INTERVAL_SECONDS = int(config('NOTE_REAPER_INTERVAL_SECONDS', default=300))
+
+class NoteReaper:
+    """Periodically deletes expired temp notes in chunks and records what it removed"""
+
+    def __init__(self, interval_seconds: int = NOTE_REAPER_INTERVAL_SECONDS, batch_size: int = NOTE_CLEANUP_BATCH_SIZE):
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.errors = 0
+        self.total_deleted = 0
+        self.total_batches = 0
+        self.last_deleted = 0
+        self.last_duration_ms = 0.0
+        self.last_run_at: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+
+    async def run_once(self) -> int:
+        """Delete every currently expired note, returning how many were removed"""
+        start = time.perf_counter()
+        db = SessionLocal()
+        try:
+            deleted, batches = await run_blocking(delete_expired_notes, db, self.batch_size)
+        except Exception as e:
+            self.errors += 1
+            self.last_error = str(e)
+            raise
+        finally:
+            db.close()
+            self.runs += 1
+            self.last_run_at = datetime.now(timezone.utc)
+            self.last_duration_ms = (time.perf_counter() - start) * 1000
+        self.last_deleted = deleted
+        self.total_deleted += deleted
+        self.total_batches += batches
+        if deleted:
+            logger.info(f"Reaped {deleted} expired notes in {batches} batches ({self.last_duration_ms:.1f}ms)")
+        return deleted
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.warning(f"Expired note cleanup failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self):
+        """Start the reaper loop on the running event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_metrics(self) -> dict:
+        """Deleted counts and timings for monitoring"""
+        return {
+            "enabled": NOTE_REAPER_ENABLED,
+            "running": self._task is not None and not self._task.done(),
+            "interval_seconds": self.interval_seconds,
+            "batch_size": self.batch_size,
+            "runs": self.runs,
+            "errors": self.errors,
+            "total_deleted": self.total_deleted,
+            "total_batches": self.total_batches,
+            "last_deleted": self.last_deleted,
+            "last_duration_ms": round(self.last_duration_ms, 2),
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "last_error": self.last_error,
+        }
+
+note_reaper = NoteReaper()
@@ -1,18 +1,28 @@
 import uuid
 from fastapi import HTTPException, UploadFile
+from decouple import config
+from sqlalchemy import insert, delete, select
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Tuple
 from models import TempNote, ClassFolder, Question, QuestionOption
-from .note_processor import NoteProcessor
+from .note_processor import NoteProcessor, spool_upload
+from .auth import Principal
+from .upload_jobs import UploadJob, UploadJobFile, upload_job_queue
+from .blocking import run_blocking
+from .folder_catalog import public_folder_catalog
 from services.question_generator import QuestionGenerator
 from database import get_db
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+
+# Rows removed per DELETE statement when clearing expired notes
+NOTE_CLEANUP_BATCH_SIZE = int(config('NOTE_CLEANUP_BATCH_SIZE', default=500))
+
 async def upload_notes(
     folder_id: str,
     files: List[UploadFile],
     db: Session
 ):
-    """Upload notes to a class folder for processing"""
+    """Accept notes for a class folder and queue them for extraction"""
     try:
         # Validate UUID format first
         try:
@@ -20,63 +30,54 @@ async def upload_notes(
         except ValueError:
             raise HTTPException(status_code=400, detail=f"Invalid folder ID format: {folder_id}")
         
-        # Check if folder exists
-        folder = db.query(ClassFolder).filter(ClassFolder.id == folder_uuid).first()
+        # Check if folder exists (sync session, so run it off the event loop)
+        folder = await run_blocking(
+            lambda: db.query(ClassFolder).filter(ClassFolder.id == folder_uuid).first()
+        )
         if not folder:
             raise HTTPException(status_code=404, detail="Class folder not found")
         
         processor = NoteProcessor()
-        uploaded_notes = []
-        
-        for file in files:
-            try:
-                # Process and extract text
-                content = await processor.process_file(file)
-                
-                # Get file size safely
-                file_size = getattr(file, 'size', None)
-                if file_size is None:
-                    # Calculate size from content if not available
-                    file_content = await file.read()
-                    file_size = len(file_content)
-                    # Reset file pointer
-                    await file.seek(0)
-                
-                # Store in temp_notes
-                temp_note = TempNote(
-                    user_id=folder.owner_id,
-                    class_folder_id=folder_uuid,
-                    file_name=file.filename,
-                    file_type=file.content_type,
-                    content=content,
-                    file_size=file_size
-                )
-                db.add(temp_note)
-                uploaded_notes.append({
-                    "filename": file.filename,
-                    "size": file_size,
-                    "type": file.content_type
-                })
-                
-            except Exception as file_error:
-                print(f"Error processing file {file.filename}: {file_error}")
-                raise HTTPException(status_code=400, detail=f"Failed to process file {file.filename}: {str(file_error)}")
+        job = UploadJob(folder_id, folder.owner_id, [])
+        try:
+            for file in files:
+                try:
+                    # Spool now, while the request body is still readable; size
+                    # and hash are taken on the way and extraction happens later
+                    processor.check_supported(file)
+                    spooled = await spool_upload(file)
+                except Exception as file_error:
+                    if isinstance(file_error, HTTPException) and file_error.status_code == 413:
+                        raise  # The size limit is reported as-is
+                    reason = getattr(file_error, "detail", None) or str(file_error)
+                    print(f"Error processing file {file.filename}: {reason}")
+                    raise HTTPException(status_code=400, detail=f"Failed to process file {file.filename}: {reason}")
+                job.files.append(UploadJobFile(file.filename, file.content_type, spooled))
+        except Exception:
+            job.remove_spooled_files()
+            raise
         
-        db.commit()
+        await upload_job_queue.submit(job)
         return {
-            "message": f"Uploaded {len(files)} files successfully",
-            "files": uploaded_notes,
-            "folder_id": folder_id
+            **job.to_dict(),
+            "message": f"Queued {len(files)} files for processing",
+            "status_url": f"/notes/jobs/{job.id}"
         }
         
     except HTTPException:
-        db.rollback()
         raise
     except Exception as e:
-        db.rollback()
         print(f"Upload service error: {e}")
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
+async def get_upload_job(job_id: str, current_user: Principal):
+    """Status, per-file progress and, once finished, the result of an upload job"""
+    job = await upload_job_queue.get(job_id)
+    # Other users' jobs are reported as missing rather than forbidden
+    if job is None or str(job.owner_id) != str(current_user.id):
+        raise HTTPException(status_code=404, detail="Upload job not found")
+    return job.to_dict()
+
 # Test endpoint to create a folder for testing
 async def create_test_folder(db: Session):
     """Create a test folder for development"""
@@ -94,6 +95,112 @@ async def create_test_folder(db: Session):
         "message": "Test folder created"
     }
     
+def build_question_options(q_data: dict) -> List[tuple]:
+    """(letter, text, is_correct) options for a generated question; every type is stored as multiple choice for battles"""
+    if q_data["type"] == "multiple_choice" and "options" in q_data:
+        # Multiple choice questions now have options as an array
+        options = q_data["options"]
+        if isinstance(options, list):
+            # Handle array format (new format)
+            return [
+                (chr(65 + i), option_text, option_text == q_data["correct_answer"])  # A, B, C, D
+                for i, option_text in enumerate(options)
+            ]
+        if isinstance(options, dict):
+            # Handle dict format (old format for backward compatibility)
+            return [
+                (option_letter, option_text, option_letter == q_data["correct_answer"])
+                for option_letter, option_text in options.items()
+            ]
+    elif q_data["type"] == "true_false":
+        # Convert true/false to multiple choice with True/False options
+        return [
+            ("A", "True", q_data["correct_answer"].lower() == "true"),
+            ("B", "False", q_data["correct_answer"].lower() == "false"),
+        ]
+    elif q_data["type"] == "short_answer":
+        # Convert short answer to multiple choice with better options
+        correct_answer = q_data["correct_answer"]
+        options = [
+            correct_answer,
+            f"Not {correct_answer}",
+            "None of the above",
+            "All of the above"
+        ]
+        # First option (correct answer) is correct
+        return [(chr(65 + i), option_text, i == 0) for i, option_text in enumerate(options)]
+    return []
+
+def build_question_rows(folder_uuid: uuid.UUID, generated_questions: List[dict], difficulty: str):
+    """Question and option rows with client-side ids, so no flush is needed to link them"""
+    question_rows = []
+    option_rows = []
+    for q_data in generated_questions:
+        question_id = uuid.uuid4()
+        question_rows.append({
+            "id": question_id,
+            "class_folder_id": folder_uuid,
+            "question_text": q_data["question"],
+            "question_type": q_data["type"],
+            "difficulty_level": difficulty,
+            "topic": q_data.get("topic"),
+            "correct_answer": q_data["correct_answer"],
+            "explanation": q_data.get("explanation"),
+            "points_value": q_data.get("points", 10)
+        })
+        for option_letter, option_text, is_correct in build_question_options(q_data):
+            option_rows.append({
+                "id": uuid.uuid4(),
+                "question_id": question_id,
+                "option_letter": option_letter,
+                "option_text": option_text,
+                "is_correct": is_correct
+            })
+    return question_rows, option_rows
+
+def insert_question_rows(db: Session, question_rows: List[dict], option_rows: List[dict]):
+    """Insert questions then options as two executemany statements"""
+    # Rows all share the same keys, so each list goes out as batched multi-row INSERTs
+    if question_rows:
+        db.execute(insert(Question), question_rows)
+    if option_rows:
+        db.execute(insert(QuestionOption), option_rows)
+
+def load_folder_notes(db: Session, folder_uuid: uuid.UUID) -> Tuple[List[uuid.UUID], str]:
+    """Ids and combined content of the notes waiting in a folder"""
+    temp_notes = db.query(TempNote).filter(
+        TempNote.class_folder_id == folder_uuid
+    ).all()
+    return [note.id for note in temp_notes], "\n\n".join([note.content for note in temp_notes])
+
+def save_generated_questions(
+    db: Session,
+    folder_uuid: uuid.UUID,
+    note_ids: List[uuid.UUID],
+    question_rows: List[dict],
+    option_rows: List[dict]
+) -> ClassFolder:
+    """Insert the questions, bump the folder's count and delete the used notes in one transaction"""
+    try:
+        insert_question_rows(db, question_rows, option_rows)
+        
+        # Update folder question count
+        folder = db.query(ClassFolder).filter(ClassFolder.id == folder_uuid).first()
+        folder.question_count += len(question_rows)
+        
+        # Delete temp notes
+        db.execute(
+            delete(TempNote).where(TempNote.id.in_(note_ids)),
+            execution_options={"synchronize_session": False}
+        )
+        
+        db.commit()
+        db.refresh(folder)  # Loaded here, so the catalog update doesn't query on the event loop
+        return folder
+    except Exception:
+        db.rollback()
+        raise
+
 async def generate_questions(
     folder_id: str,
     question_count: int,
@@ -104,17 +211,12 @@ async def generate_questions(
     try:
         folder_uuid = uuid.UUID(folder_id)
         
-        # Get all temp notes for this folder
-        temp_notes = db.query(TempNote).filter(
-            TempNote.class_folder_id == folder_uuid
-        ).all()
+        # Get all temp notes for this folder; the sync session is only used off the event loop
+        note_ids, combined_content = await run_blocking(load_folder_notes, db, folder_uuid)
         
-        if not temp_notes:
+        if not note_ids:
             raise HTTPException(status_code=404, detail="No notes found to process")
         
-        # Combine all note content
-        combined_content = "\n\n".join([note.content for note in temp_notes])
-        
         # Generate questions using AI
         generator = QuestionGenerator()
         generated_questions = await generator.generate_questions(
@@ -123,117 +225,50 @@ async def generate_questions(
             difficulty=difficulty
         )
         
-        # Save questions to database
-        saved_questions = []
-        for q_data in generated_questions:
-            question = Question(
-                class_folder_id=folder_uuid,
-                question_text=q_data["question"],
-                question_type=q_data["type"],
-                difficulty_level=difficulty,
-                topic=q_data.get("topic"),
-                correct_answer=q_data["correct_answer"],
-                explanation=q_data.get("explanation"),
-                points_value=q_data.get("points", 10)
-            )
-            db.add(question)
-            db.flush()  # Get the question ID
-            
-            # Create options for all question types to make them compatible with battles
-            if q_data["type"] == "multiple_choice" and "options" in q_data:
-                # Multiple choice questions now have options as an array
-                options = q_data["options"]
-                if isinstance(options, list):
-                    # Handle array format (new format)
-                    for i, option_text in enumerate(options):
-                        option_letter = chr(65 + i)  # A, B, C, D
-                        is_correct = option_text == q_data["correct_answer"]
-                        option = QuestionOption(
-                            question_id=question.id,
-                            option_letter=option_letter,
-                            option_text=option_text,
-                            is_correct=is_correct
-                        )
-                        db.add(option)
-                elif isinstance(options, dict):
-                    # Handle dict format (old format for backward compatibility)
-                    for option_letter, option_text in options.items():
-                        is_correct = option_letter == q_data["correct_answer"]
-                        option = QuestionOption(
-                            question_id=question.id,
-                            option_letter=option_letter,
-                            option_text=option_text,
-                            is_correct=is_correct
-                        )
-                        db.add(option)
-            elif q_data["type"] == "true_false":
-                # Convert true/false to multiple choice with True/False options
-                true_option = QuestionOption(
-                    question_id=question.id,
-                    option_letter="A",
-                    option_text="True",
-                    is_correct=(q_data["correct_answer"].lower() == "true")
-                )
-                false_option = QuestionOption(
-                    question_id=question.id,
-                    option_letter="B",
-                    option_text="False",
-                    is_correct=(q_data["correct_answer"].lower() == "false")
-                )
-                db.add(true_option)
-                db.add(false_option)
-            elif q_data["type"] == "short_answer":
-                # Convert short answer to multiple choice with better options
-                correct_answer = q_data["correct_answer"]
-                # Create more meaningful options based on the correct answer
-                options = [
-                    correct_answer,
-                    f"Not {correct_answer}",
-                    "None of the above",
-                    "All of the above"
-                ]
-                for i, option_text in enumerate(options):
-                    option = QuestionOption(
-                        question_id=question.id,
-                        option_letter=chr(65 + i),  # A, B, C, D
-                        option_text=option_text,
-                        is_correct=(i == 0)  # First option (correct answer) is correct
-                    )
-                    db.add(option)
-            
-            saved_questions.append(question)
-        
-        # Update folder question count
-        folder = db.query(ClassFolder).filter(ClassFolder.id == folder_uuid).first()
-        folder.question_count += len(generated_questions)
-        
-        # Delete temp notes
-        for note in temp_notes:
-            db.delete(note)
-        
-        db.commit()
+        # Save questions and options in two multi-row inserts
+        question_rows, option_rows = build_question_rows(folder_uuid, generated_questions, difficulty)
+        folder = await run_blocking(save_generated_questions, db, folder_uuid, note_ids, question_rows, option_rows)
+        # question_count is part of the public catalog's cached response
+        public_folder_catalog.upsert(folder)
         
         return {
             "message": f"Generated {len(generated_questions)} questions successfully",
             "questions_generated": len(generated_questions),
             "folder_id": folder_id,
-            "notes_processed": len(temp_notes)
+            "notes_processed": len(note_ids)
         }
         
     except Exception as e:
-        db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+def delete_expired_notes_batch(db: Session, batch_size: int) -> int:
+    """Delete up to batch_size expired notes without loading their content"""
+    # Picking ids by expires_at keeps each statement on ix_temp_notes_expires_at
+    # and each transaction short, however large the backlog is
+    expired_ids = select(TempNote.id).where(
+        TempNote.expires_at < datetime.now(timezone.utc)
+    ).order_by(TempNote.expires_at).limit(batch_size)
+    result = db.execute(
+        delete(TempNote).where(TempNote.id.in_(expired_ids)),
+        execution_options={"synchronize_session": False}
+    )
+    db.commit()
+    return result.rowcount
+
+def delete_expired_notes(db: Session, batch_size: int = NOTE_CLEANUP_BATCH_SIZE) -> Tuple[int, int]:
+    """Delete all expired notes in chunks, returning (deleted, batches)"""
+    deleted = 0
+    batches = 0
+    while True:
+        batch_deleted = delete_expired_notes_batch(db, batch_size)
+        batches += 1
+        deleted += batch_deleted
+        if batch_deleted < batch_size:
+            return deleted, batches
+
 async def cleanup_expired_notes(
     db: Session
 ):
     """Clean up expired temporary notes"""
-    expired_notes = db.query(TempNote).filter(
-        TempNote.expires_at < datetime.utcnow()
-    ).all()
-    
-    for note in expired_notes:
-        db.delete(note)
-    
-    db.commit()
-    return {"deleted": len(expired_notes)}
\ No newline at end of file
+    deleted, _ = await run_blocking(delete_expired_notes, db)
+    return {"deleted": deleted}
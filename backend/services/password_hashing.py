@@ -0,0 +1,46 @@
+from decouple import config
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from .process_pool import BoundedProcessPool
+
+# Worker processes for bcrypt; each hash is ~250 ms of CPU, so keep this below
+# the core count to leave room for the event loop and request threads
+PASSWORD_HASH_WORKERS = int(config('PASSWORD_HASH_WORKERS', default=2))
+# Hashes allowed to wait for a worker before signup/login is refused with a 429
+PASSWORD_HASH_MAX_QUEUE = int(config('PASSWORD_HASH_MAX_QUEUE', default=16))
+# Retry-After sent with the 429
+PASSWORD_HASH_RETRY_AFTER_SECONDS = 1
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordHasher(BoundedProcessPool):
+    """Small process pool for bcrypt, so login bursts can't starve the shared threadpool"""
+
+    def __init__(self, max_workers: int = PASSWORD_HASH_WORKERS, max_queue: int = PASSWORD_HASH_MAX_QUEUE):
+        super().__init__("password hashing", max_workers, max_queue)
+
+    def rejection(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many sign-in attempts right now, please retry shortly",
+            headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+        )
+
+    async def hash(self, password: str) -> str:
+        return await self.run(_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.run(_verify, plain_password, hashed_password)
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,137 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+from decouple import config
+from sqlalchemy import event, inspect
+
+from models import User
+
+# How long a verified identity is reused before users is queried again
+AUTH_CACHE_TTL_SECONDS = int(config('AUTH_CACHE_TTL_SECONDS', default=60))
+# Cached (user, token) pairs per worker; least recently used are dropped first
+AUTH_CACHE_MAX_ENTRIES = int(config('AUTH_CACHE_MAX_ENTRIES', default=10000))
+
+# Columns copied into a Principal; changing any of them invalidates the user's entries
+PRINCIPAL_FIELDS = ("id", "username", "email")
+
+
+class Principal:
+    """Identity of an authenticated user, detached from any session"""
+    __slots__ = PRINCIPAL_FIELDS
+
+    def __init__(self, id: uuid.UUID, username: str, email: str):
+        self.id = id
+        self.username = username
+        self.email = email
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(user.id, user.username, user.email)
+
+    def __setattr__(self, name, value):
+        if hasattr(self, name):
+            raise AttributeError(f"Principal.{name} is read-only")
+        super().__setattr__(name, value)
+
+    def __repr__(self):
+        return f"Principal(id={self.id!r}, username={self.username!r})"
+
+
+class PrincipalCache:
+    """Bounded TTL/LRU cache of principals keyed by (user id, token exp)"""
+
+    def __init__(self, ttl_seconds: int = AUTH_CACHE_TTL_SECONDS, max_entries: int = AUTH_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # (user id, exp) -> (principal, monotonic deadline), oldest use first
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[Principal, float]]" = OrderedDict()
+        self._by_user: Dict[str, Set[int]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, user_id: str, exp: int) -> Optional[Principal]:
+        key = (user_id, exp)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None:
+                self.misses += 1
+                return None
+            principal, deadline = cached
+            if time.monotonic() >= deadline:
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return principal
+
+    def put(self, user_id: str, exp: int, principal: Principal):
+        # Never outlive the token itself
+        lifetime = min(self.ttl_seconds, exp - time.time())
+        if lifetime <= 0 or self.max_entries <= 0:
+            return
+        key = (user_id, exp)
+        with self._lock:
+            self._entries[key] = (principal, time.monotonic() + lifetime)
+            self._entries.move_to_end(key)
+            self._by_user.setdefault(user_id, set()).add(exp)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: Tuple[str, int]):
+        self._entries.pop(key, None)
+        exps = self._by_user.get(key[0])
+        if exps is not None:
+            exps.discard(key[1])
+            if not exps:
+                del self._by_user[key[0]]
+
+    def invalidate(self, user_id):
+        """Drop every cached token for a user"""
+        user_id = str(user_id)
+        with self._lock:
+            for exp in list(self._by_user.get(user_id, ())):
+                self._remove((user_id, exp))
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def get_metrics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "users": len(self._by_user),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+principal_cache = PrincipalCache()
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_changed_user(mapper, connection, target):
+    # Stats columns change after every battle; only identity changes matter here
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in PRINCIPAL_FIELDS):
+        principal_cache.invalidate(target.id)
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_deleted_user(mapper, connection, target):
+    principal_cache.invalidate(target.id)
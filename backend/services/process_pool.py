@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# Workers are started by a fork server rather than forked from the API process,
+# whose event loop and thread pools may hold locks at the moment of the fork
+POOL_START_METHOD = "forkserver"
+# Imported once in the fork server, so replacement workers start warm; the fork
+# server resolves them from the working directory, like uvicorn main:app
+POOL_PRELOAD_MODULES = ["services.extraction", "services.password_hashing"]
+
+
+def _pool_context():
+    context = multiprocessing.get_context(POOL_START_METHOD)
+    context.set_forkserver_preload(POOL_PRELOAD_MODULES)
+    return context
+
+
+def _timed(func: Callable, *args):
+    """Runs in the worker: (result, wall-clock start, duration)"""
+    started_at = time.time()
+    begin = time.perf_counter()
+    result = func(*args)
+    return result, started_at, time.perf_counter() - begin
+
+
+class BoundedProcessPool:
+    """Process pool that caps queued jobs and records queue wait and run time"""
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, timeout_seconds: Optional[float] = None):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout_seconds = timeout_seconds
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.restarts = 0
+        self.recent_waits_ms = deque(maxlen=1000)
+        self.recent_run_ms = deque(maxlen=1000)
+        self.recent_total_ms = deque(maxlen=1000)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=_pool_context()
+                )
+            return self._executor
+
+    def _discard_executor(self, executor: ProcessPoolExecutor):
+        """Replace a broken or wedged pool; the next job starts a fresh one"""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+            self.restarts += 1
+        # shutdown() can't stop a job that is already running, so kill the workers;
+        # other jobs still running on this pool fail with BrokenProcessPool
+        # ProcessPoolExecutor has no public handle on its workers; _processes is a
+        # CPython implementation detail, so without it the wedged worker is left to finish
+        processes = list((getattr(executor, "_processes", None) or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            if process.is_alive():
+                process.kill()
+
+    def start(self):
+        """Spawn the workers up front so the first jobs don't pay for it"""
+        executor = self._get_executor()
+        for _ in range(self.max_workers):
+            executor.submit(time.time)
+
+    def shutdown(self):
+        """Stop the workers; queued jobs are cancelled, running ones finish"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def rejection(self) -> HTTPException:
+        """Error raised when the queue is full"""
+        return HTTPException(status_code=503, detail="Server is busy, please retry shortly")
+
+    async def run(self, func: Callable, *args, timeout: Optional[float] = None, admit: bool = True) -> Any:
+        """Run func(*args) in a worker process; func and its arguments must pickle"""
+        # admit=False skips the queue limit, for follow-up jobs of work that was
+        # already admitted and is bounded some other way
+        with self._lock:
+            if admit and self.in_flight >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                logger.warning(f"{self.name} pool queue full ({self.in_flight} in flight), rejecting {func.__name__}")
+                raise self.rejection()
+            self.in_flight += 1
+        timeout = timeout if timeout is not None else self.timeout_seconds
+        submitted_at = time.time()
+        begin = time.perf_counter()
+        executor = self._get_executor()
+        try:
+            future = executor.submit(_timed, func, *args)
+            result, started_at, duration = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.failed += 1
+                self.timed_out += 1
+            logger.error(f"{self.name} job {func.__name__} exceeded {timeout}s, restarting the pool")
+            # The worker can't be interrupted from here, so stop feeding that pool
+            self._discard_executor(executor)
+            raise HTTPException(status_code=504, detail=f"{self.name.capitalize()} timed out")
+        except BrokenProcessPool:
+            with self._lock:
+                self.failed += 1
+            logger.error(f"{self.name} worker died, restarting the pool")
+            self._discard_executor(executor)
+            raise HTTPException(status_code=503, detail="Server is busy, please retry shortly")
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        with self._lock:
+            self.completed += 1
+            self.recent_waits_ms.append(max(0.0, started_at - submitted_at) * 1000)
+            self.recent_run_ms.append(duration * 1000)
+            self.recent_total_ms.append((time.perf_counter() - begin) * 1000)
+        return result
+
+    def get_metrics(self) -> dict:
+        """Queue depth, rejections and wait/run/total latency percentiles"""
+        with self._lock:
+            metrics = {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "queue_depth": max(0, self.in_flight - self.max_workers),
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "restarts": self.restarts,
+            }
+            samples = {
+                "wait_ms": sorted(self.recent_waits_ms),
+                "run_ms": sorted(self.recent_run_ms),
+                "total_ms": sorted(self.recent_total_ms),
+            }
+        for name, values in samples.items():
+            if values:
+                metrics[f"{name}_p50"] = round(values[len(values) // 2], 2)
+                metrics[f"{name}_p95"] = round(values[min(len(values) - 1, int(len(values) * 0.95))], 2)
+        return metrics
@@ -0,0 +1,368 @@
+import asyncio
+import importlib
+import logging
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from decouple import config
+from fastapi import HTTPException
+
+from database import SessionLocal
+from models import TempNote
+from .blocking import run_blocking
+from .note_processor import NoteProcessor, SpooledUpload
+from .websocket_manager import manager
+
+logger = logging.getLogger(__name__)
+
+# Uploads processed at once; each one holds at most one file in the extraction pool
+UPLOAD_JOB_WORKERS = int(config('UPLOAD_JOB_WORKERS', default=2))
+# Accepted uploads waiting for a worker before new ones get a 503
+UPLOAD_JOB_MAX_QUEUE = int(config('UPLOAD_JOB_MAX_QUEUE', default=32))
+# How long a finished job's status stays available to GET /notes/jobs/{id}
+UPLOAD_JOB_RETENTION_SECONDS = int(config('UPLOAD_JOB_RETENTION_SECONDS', default=3600))
+# Dotted path of the JobBroker class that queues jobs and stores their status
+UPLOAD_JOB_BROKER = config('UPLOAD_JOB_BROKER', default='services.upload_jobs.InProcessBroker')
+
+QUEUED = "queued"
+PROCESSING = "processing"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+class UploadJobFile:
+    """One spooled file of an upload job and how far its extraction has got"""
+
+    def __init__(self, filename: str, content_type: str, spooled: SpooledUpload):
+        self.filename = filename
+        self.content_type = content_type
+        self.spooled = spooled
+        self.status = QUEUED
+        self.pages_done = 0
+        self.pages_total: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "filename": self.filename,
+            "type": self.content_type,
+            "size": self.spooled.size,
+            "status": self.status,
+            "pages_done": self.pages_done,
+            "pages_total": self.pages_total,
+            "error": self.error,
+        }
+
+
+class UploadJob:
+    """Files uploaded to a folder in one request, extracted in the background"""
+
+    def __init__(self, folder_id: str, owner_id: uuid.UUID, files: List[UploadJobFile]):
+        self.id = str(uuid.uuid4())
+        self.folder_id = folder_id
+        self.owner_id = owner_id
+        self.files = files
+        self.status = QUEUED
+        self.error: Optional[str] = None
+        self.result: Optional[dict] = None
+        self.created_at = datetime.now(timezone.utc)
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (COMPLETED, FAILED)
+
+    def remove_spooled_files(self):
+        for job_file in self.files:
+            try:
+                os.unlink(job_file.spooled.path)
+            except FileNotFoundError:
+                pass
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "folder_id": self.folder_id,
+            "status": self.status,
+            "files": [job_file.to_dict() for job_file in self.files],
+            "error": self.error,
+            "result": self.result,
+            "created_at": _isoformat(self.created_at),
+            "started_at": _isoformat(self.started_at),
+            "finished_at": _isoformat(self.finished_at),
+        }
+
+
+class JobBroker(ABC):
+    """Queues upload jobs and keeps their status; subclass to back it with an external queue"""
+    # Spooled files are paths on this host, so a broker that hands jobs to other
+    # machines also needs the spool directory on shared storage
+
+    def start(self):
+        """Called on the running event loop before any job is published"""
+
+    @abstractmethod
+    async def publish(self, job: UploadJob):
+        """Queue a job, raising an HTTPException if it can't be accepted"""
+
+    @abstractmethod
+    async def consume(self) -> UploadJob:
+        """Wait for the next job to process"""
+
+    @abstractmethod
+    async def save(self, job: UploadJob):
+        """Record a job's latest status"""
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[UploadJob]:
+        """A job by id, or None if this broker doesn't know it"""
+
+    def drain(self) -> List[UploadJob]:
+        """Remove and return jobs still waiting, at shutdown"""
+        return []
+
+    def get_metrics(self) -> dict:
+        return {}
+
+
+class InProcessBroker(JobBroker):
+    """Bounded asyncio queue with job status kept in memory on this worker"""
+    # Jobs exist only in the process that accepted them: with several server
+    # workers, polling a job through another one gets a 404. Run one worker
+    # per host, or configure a shared broker with UPLOAD_JOB_BROKER.
+
+    def __init__(self, max_queue: int = UPLOAD_JOB_MAX_QUEUE, retention_seconds: int = UPLOAD_JOB_RETENTION_SECONDS):
+        self.max_queue = max_queue
+        self.retention_seconds = retention_seconds
+        self._queue: Optional[asyncio.Queue] = None
+        self._jobs: Dict[str, UploadJob] = {}
+        self.published = 0
+        self.rejected = 0
+
+    def start(self):
+        # A queue belongs to the loop that first waits on it, so make it on this one
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        server_workers = int(os.getenv('WEB_CONCURRENCY', '1'))
+        if server_workers > 1:
+            logger.warning(
+                f"Upload jobs use the in-process broker with {server_workers} server workers; "
+                f"job status is per worker, so polling can 404 on another worker"
+            )
+
+    def _prune(self):
+        """Forget finished jobs older than the retention period"""
+        now = datetime.now(timezone.utc)
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.is_finished and (now - job.finished_at).total_seconds() > self.retention_seconds
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    async def publish(self, job: UploadJob):
+        self._prune()
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Server is busy, please retry shortly")
+        self._jobs[job.id] = job
+        self.published += 1
+
+    async def consume(self) -> UploadJob:
+        return await self._queue.get()
+
+    async def save(self, job: UploadJob):
+        self._jobs[job.id] = job  # Status lives on the job object itself
+
+    async def get(self, job_id: str) -> Optional[UploadJob]:
+        return self._jobs.get(job_id)
+
+    def drain(self) -> List[UploadJob]:
+        jobs = []
+        while self._queue is not None and not self._queue.empty():
+            jobs.append(self._queue.get_nowait())
+        return jobs
+
+    def get_metrics(self) -> dict:
+        return {
+            "broker": type(self).__name__,
+            "max_queue": self.max_queue,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "tracked_jobs": len(self._jobs),
+            "published": self.published,
+            "rejected": self.rejected,
+        }
+
+
+def load_broker(path: str = UPLOAD_JOB_BROKER) -> JobBroker:
+    """Instantiate the broker class named by a dotted path"""
+    module_name, _, class_name = path.rpartition('.')
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def _save_notes(notes: List[TempNote]):
+    """Store a job's notes together, so a failed file leaves none of them behind"""
+    db = SessionLocal()
+    try:
+        db.add_all(notes)
+        db.commit()
+    finally:
+        db.close()
+
+
+class UploadJobQueue:
+    """Runs upload jobs from the broker on a fixed number of worker tasks"""
+
+    def __init__(self, broker: Optional[JobBroker] = None, workers: int = UPLOAD_JOB_WORKERS):
+        self.broker = broker or load_broker()
+        self.workers = workers
+        self._tasks: List[asyncio.Task] = []
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.recent_wait_ms = deque(maxlen=1000)
+        self.recent_run_ms = deque(maxlen=1000)
+
+    def start(self):
+        """Start the worker tasks on the running event loop"""
+        self.broker.start()
+        logger.info(f"Upload jobs: {self.workers} workers on {type(self.broker).__name__}")
+        self._tasks = [task for task in self._tasks if not task.done()]
+        while len(self._tasks) < self.workers:
+            self._tasks.append(asyncio.create_task(self._run()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        for job in self.broker.drain():
+            job.remove_spooled_files()
+
+    async def submit(self, job: UploadJob):
+        """Queue a job whose files are already spooled; they are removed if it can't be queued"""
+        try:
+            await self.broker.publish(job)
+        except Exception:
+            job.remove_spooled_files()
+            raise
+        await self._notify(job, "UPLOAD_JOB_QUEUED")
+
+    async def get(self, job_id: str) -> Optional[UploadJob]:
+        return await self.broker.get(job_id)
+
+    async def _run(self):
+        while True:
+            job = await self.broker.consume()
+            self.active += 1
+            try:
+                await self.process(job)
+            except Exception as e:
+                logger.error(f"Upload job {job.id} crashed: {e}")
+            finally:
+                self.active -= 1
+
+    async def _notify(self, job: UploadJob, message_type: str):
+        """Push a job's status to the folder owner, the only user allowed to see it"""
+        message = {"type": message_type, "job": job.to_dict()}
+        owner_id = str(job.owner_id)
+        try:
+            if manager.is_user_connected(owner_id):
+                await manager.send_personal_message(message, owner_id)
+        except Exception as e:
+            # Progress is best-effort; the job's status can always be polled
+            logger.warning(f"Failed to send progress for upload job {job.id}: {e}")
+
+    async def process(self, job: UploadJob):
+        """Extract every file of a job and store the notes, recording progress as it goes"""
+        job.status = PROCESSING
+        job.started_at = datetime.now(timezone.utc)
+        begin = time.perf_counter()
+        await self.broker.save(job)
+        await self._notify(job, "UPLOAD_JOB_PROGRESS")
+
+        processor = NoteProcessor()
+        notes = []
+        try:
+            for job_file in job.files:
+                job_file.status = PROCESSING
+                await self._notify(job, "UPLOAD_JOB_PROGRESS")
+
+                async def page_progress(done: int, total: int, job_file: UploadJobFile = job_file):
+                    job_file.pages_done = done
+                    job_file.pages_total = total
+                    await self._notify(job, "UPLOAD_JOB_PROGRESS")
+
+                try:
+                    text = await processor.extract_spooled(job_file.content_type, job_file.spooled, page_progress)
+                except Exception as file_error:
+                    job_file.status = FAILED
+                    job_file.error = getattr(file_error, "detail", None) or str(file_error)
+                    raise RuntimeError(f"Failed to process file {job_file.filename}: {job_file.error}")
+                job_file.status = COMPLETED
+                notes.append(TempNote(
+                    user_id=job.owner_id,
+                    class_folder_id=uuid.UUID(job.folder_id),
+                    file_name=job_file.filename,
+                    file_type=job_file.content_type,
+                    content=text,
+                    file_size=job_file.spooled.size
+                ))
+
+            await run_blocking(_save_notes, notes)
+            job.result = {
+                "message": f"Uploaded {len(job.files)} files successfully",
+                "files": [
+                    {"filename": job_file.filename, "size": job_file.spooled.size, "type": job_file.content_type}
+                    for job_file in job.files
+                ],
+                "folder_id": job.folder_id
+            }
+            job.status = COMPLETED
+            self.completed += 1
+        except Exception as e:
+            job.status = FAILED
+            job.error = getattr(e, "detail", None) or str(e)
+            self.failed += 1
+            logger.warning(f"Upload job {job.id} failed: {job.error}")
+        finally:
+            job.remove_spooled_files()
+            job.finished_at = datetime.now(timezone.utc)
+            self.recent_wait_ms.append((job.started_at - job.created_at).total_seconds() * 1000)
+            self.recent_run_ms.append((time.perf_counter() - begin) * 1000)
+            await self.broker.save(job)
+        await self._notify(job, "UPLOAD_JOB_COMPLETED" if job.status == COMPLETED else "UPLOAD_JOB_FAILED")
+
+    def get_metrics(self) -> dict:
+        """Worker counts, outcomes and queue wait/run time percentiles"""
+        metrics = {
+            "workers": self.workers,
+            "running": sum(1 for task in self._tasks if not task.done()),
+            "active": self.active,
+            "completed": self.completed,
+            "failed": self.failed,
+            **self.broker.get_metrics(),
+        }
+        for name, values in (("wait_ms", sorted(self.recent_wait_ms)), ("run_ms", sorted(self.recent_run_ms))):
+            if values:
+                metrics[f"{name}_p50"] = round(values[len(values) // 2], 2)
+                metrics[f"{name}_p95"] = round(values[min(len(values) - 1, int(len(values) * 0.95))], 2)
+        return metrics
+
+
+upload_job_queue = UploadJobQueue()
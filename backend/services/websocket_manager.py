@@ -1,50 +1,395 @@
 from fastapi import WebSocket
-from typing import Dict, List
+from typing import Dict, List, Set, Iterable, Optional, Union, Callable
+from collections import deque
+from decouple import config
+import asyncio
 import json
 import logging
+import time
+import zlib
 from sqlalchemy.orm import Session
 
+from .ws_codec import encode_binary, encode_binary_batch, is_binary_available
+
 logger = logging.getLogger(__name__)
 
+# Resumable sessions: how many outbound messages are kept per user and how long
+# a disconnected user's session survives before a RESUME can no longer succeed
+REPLAY_BUFFER_SIZE = int(config('WS_REPLAY_BUFFER_SIZE', default=256))
+RESUME_WINDOW_SECONDS = int(config('WS_RESUME_WINDOW_SECONDS', default=120))
+
+# Negotiated subprotocols -> (encoding, coalesce). Batch protocols receive arrays
+# of messages: everything queued within the coalesce window goes out as one frame.
+# Clients offering none of these keep plain JSON, one object per frame.
+COALESCE_SUBPROTOCOL = "brainduel.batch.v1"
+BINARY_SUBPROTOCOL = "brainduel.msgpack.v1"
+BINARY_COALESCE_SUBPROTOCOL = "brainduel.msgpack.batch.v1"
+SUBPROTOCOLS = {
+    COALESCE_SUBPROTOCOL: ("json", True),
+    BINARY_SUBPROTOCOL: ("msgpack", False),
+    BINARY_COALESCE_SUBPROTOCOL: ("msgpack", True),
+}
+COALESCE_WINDOW_SECONDS = float(config('WS_COALESCE_WINDOW_MS', default=5)) / 1000
+
+# Opt-in compression for JSON clients connecting with ?compression=deflate.
+# Frames at or above the threshold are sent as binary raw-deflate JSON; smaller
+# frames stay plain text, since deflating them costs more CPU than it saves.
+DEFLATE_ENABLED = config('WS_DEFLATE_ENABLED', default=True, cast=bool)
+DEFLATE_THRESHOLD_BYTES = int(config('WS_DEFLATE_THRESHOLD_BYTES', default=1024))
+DEFLATE_LEVEL = int(config('WS_DEFLATE_LEVEL', default=6))
+
+def negotiate_subprotocol(offered: List[str]) -> Optional[str]:
+    """Pick the client's most preferred subprotocol that this server supports"""
+    for subprotocol in offered:
+        if subprotocol not in SUBPROTOCOLS:
+            continue
+        encoding, _ = SUBPROTOCOLS[subprotocol]
+        if encoding == "msgpack" and not is_binary_available():
+            continue
+        return subprotocol
+    return None
+
+# Topics clients can subscribe to for lobby-style announcements
+LOBBY_TOPIC = "lobby"
+
+def folder_topic(folder_id: str) -> str:
+    """Topic name for announcements about a class folder"""
+    return f"folder:{folder_id}"
+
+def university_topic(university_name: str) -> str:
+    """Topic name for announcements about a university"""
+    return f"university:{university_name.strip().lower()}"
+
+# Prefixes of the per-folder and per-university topics above
+TOPIC_PREFIXES = ("folder:", "university:")
+
+def normalize_topic(topic: str) -> Optional[str]:
+    """The topic as the server publishes it, or None if it is not one clients may subscribe to"""
+    if topic == LOBBY_TOPIC:
+        return topic
+    for prefix in TOPIC_PREFIXES:
+        if topic.startswith(prefix) and topic[len(prefix):].strip():
+            # Announcements go to university_topic(name), which strips and lowercases
+            return university_topic(topic[len(prefix):]) if prefix == "university:" else topic
+    return None
+
+class ReplaySession:
+    """Per-user outbound sequence counter with a ring buffer of recent messages"""
+
+    def __init__(self, buffer_size: int = REPLAY_BUFFER_SIZE):
+        self.last_seq = 0
+        self.buffer = deque(maxlen=buffer_size)
+        self.disconnected_at: Optional[float] = None
+
+    def record(self, message: dict) -> dict:
+        """Stamp the next sequence number on a copy of message and buffer it"""
+        self.last_seq += 1
+        stamped = {**message, "seq": self.last_seq}
+        self.buffer.append(stamped)
+        return stamped
+
+    def replay_after(self, last_seq: int) -> Optional[List[dict]]:
+        """Messages newer than last_seq, or None if some were evicted or last_seq is unknown here"""
+        if last_seq == self.last_seq:
+            return []
+        if last_seq > self.last_seq:
+            # Ahead of this session: it expired or the server restarted since
+            return None
+        oldest_seq = self.buffer[0]["seq"] if self.buffer else self.last_seq + 1
+        if last_seq + 1 < oldest_seq:
+            return None
+        return [message for message in self.buffer if message["seq"] > last_seq]
+
+    def is_expired(self, now: float) -> bool:
+        return self.disconnected_at is not None and now - self.disconnected_at > RESUME_WINDOW_SECONDS
+
+def deflate_payload(data: bytes) -> bytes:
+    """Raw deflate (no zlib header), the same format permessage-deflate uses"""
+    compressor = zlib.compressobj(DEFLATE_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+class MessageStats:
+    """Per-message-type counters of outbound messages and bytes"""
+
+    def __init__(self):
+        self.by_type: Dict[str, Dict[str, int]] = {}
+        self.frames = 0
+        self.compressed_frames = 0
+
+    def record(self, message_type: str, payload_bytes: int, wire_bytes: int):
+        stats = self.by_type.setdefault(message_type, {"messages": 0, "payload_bytes": 0, "wire_bytes": 0})
+        stats["messages"] += 1
+        stats["payload_bytes"] += payload_bytes
+        stats["wire_bytes"] += wire_bytes
+
+    def snapshot(self) -> dict:
+        """Counters sorted by wire bytes, largest first"""
+        by_type = dict(sorted(self.by_type.items(), key=lambda item: item[1]["wire_bytes"], reverse=True))
+        return {
+            "frames": self.frames,
+            "compressed_frames": self.compressed_frames,
+            "payload_bytes": sum(stats["payload_bytes"] for stats in by_type.values()),
+            "wire_bytes": sum(stats["wire_bytes"] for stats in by_type.values()),
+            "by_type": {message_type: dict(stats) for message_type, stats in by_type.items()}
+        }
+
+class ConnectionWriter:
+    """Outbound writer for one socket, coalescing frames when the client negotiated it"""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        coalesce: bool,
+        on_error: Callable[[Exception], None],
+        encoding: str = "json",
+        deflate: bool = False,
+        stats: MessageStats = None
+    ):
+        self.websocket = websocket
+        self.coalesce = coalesce
+        self.encoding = encoding
+        # Binary frames already mean msgpack there, so deflate is JSON-only
+        self.deflate = deflate and encoding == "json"
+        self.stats = stats or MessageStats()
+        self.on_error = on_error
+        self.pending: List[dict] = []
+        self.flush_task: Optional[asyncio.Task] = None
+        # Last sequence number recorded before this socket connected; later
+        # messages were sent on it live and must not be replayed again
+        self.start_seq = 0
+
+    async def send(self, message: Union[dict, str]):
+        """Send now, or queue for the next coalesced frame"""
+        if isinstance(message, str):
+            if self.encoding != "json":
+                message = json.loads(message)
+            else:
+                # Pre-encoded text can't join a batch; keep ordering by flushing first
+                await self.flush()
+                await self._send_frame(message.encode(), [("raw", len(message))], is_text=True)
+                return
+        if not self.coalesce:
+            await self._write(message)
+        else:
+            self.pending.append(message)
+            if self.flush_task is None:
+                self.flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(COALESCE_WINDOW_SECONDS)
+        self.flush_task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            self.on_error(e)
+
+    async def flush(self):
+        """Write everything queued so far as one array frame"""
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        await self._write(batch)
+
+    async def _write(self, payload: Union[dict, list]):
+        messages = payload if isinstance(payload, list) else [payload]
+        # Encode messages one by one so each type's share of the frame is known
+        if self.encoding == "msgpack":
+            parts = [encode_binary(message) for message in messages]
+            data = encode_binary_batch(parts) if isinstance(payload, list) else parts[0]
+        else:
+            parts = [json.dumps(message).encode() for message in messages]
+            data = b"[" + b", ".join(parts) + b"]" if isinstance(payload, list) else parts[0]
+        sizes = [(message.get("type", "unknown"), len(part)) for message, part in zip(messages, parts)]
+        await self._send_frame(data, sizes, is_text=self.encoding == "json")
+
+    async def _send_frame(self, data: bytes, sizes: List[tuple], is_text: bool):
+        """Send one encoded frame, deflating it if large enough, and count its bytes"""
+        wire = data
+        if self.deflate and len(data) >= DEFLATE_THRESHOLD_BYTES:
+            wire = deflate_payload(data)
+            is_text = False
+            self.stats.compressed_frames += 1
+        self.stats.frames += 1
+
+        ratio = len(wire) / len(data) if data else 1
+        for message_type, size in sizes:
+            self.stats.record(message_type, size, round(size * ratio))
+
+        if is_text:
+            await self.websocket.send_text(wire.decode())
+        else:
+            await self.websocket.send_bytes(wire)
+
+    def close(self):
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+            self.flush_task = None
+        self.pending = []
+
 class ConnectionManager:
     def __init__(self):
         self.active_connections: Dict[str, WebSocket] = {}
+        self.writers: Dict[str, ConnectionWriter] = {}
+        self.message_stats = MessageStats()
+        # topic -> user ids subscribed to it, and the reverse index for cleanup
+        self.topic_subscribers: Dict[str, Set[str]] = {}
+        self.user_topics: Dict[str, Set[str]] = {}
+        # user id -> replay session, kept across short disconnects for RESUME
+        self.sessions: Dict[str, ReplaySession] = {}
 
     async def connect(self, websocket: WebSocket, user_id: str, db: Session = None):
         """Connect user and deliver any pending invites"""
-        await websocket.accept()
+        # Older clients offer no subprotocol and keep getting one JSON object per frame
+        subprotocol = negotiate_subprotocol(websocket.scope.get("subprotocols", []))
+        encoding, coalesce = SUBPROTOCOLS.get(subprotocol, ("json", False))
+        deflate = DEFLATE_ENABLED and websocket.query_params.get("compression") == "deflate"
+        await websocket.accept(subprotocol=subprotocol)
+        previous_writer = self.writers.get(user_id)
+        if previous_writer is not None:
+            previous_writer.close()
         self.active_connections[user_id] = websocket
+        self.writers[user_id] = ConnectionWriter(
+            websocket,
+            coalesce,
+            on_error=lambda e: self._handle_send_error(user_id, websocket, e),
+            encoding=encoding,
+            deflate=deflate,
+            stats=self.message_stats
+        )
+        self._prune_sessions()
+        session = self.sessions.setdefault(user_id, ReplaySession())
+        session.disconnected_at = None
+        self.writers[user_id].start_seq = session.last_seq
         logger.info(f"User {user_id} connected. Total connections: {len(self.active_connections)}")
         
         # Deliver pending invites if database session provided
         if db:
             await self.deliver_pending_invites(user_id, db)
 
-    def disconnect(self, user_id: str):
+    def disconnect(self, user_id: str, websocket: WebSocket = None):
+        """Drop a user's connection, ignoring sockets already replaced by a reconnect"""
+        if websocket is not None and self.active_connections.get(user_id) is not websocket:
+            return
         if user_id in self.active_connections:
             del self.active_connections[user_id]
             logger.info(f"User {user_id} disconnected. Total connections: {len(self.active_connections)}")
+        writer = self.writers.pop(user_id, None)
+        if writer is not None:
+            writer.close()
+        self.unsubscribe_all(user_id)
+        session = self.sessions.get(user_id)
+        if session is not None:
+            session.disconnected_at = time.monotonic()
+
+    def _prune_sessions(self):
+        """Forget replay sessions of users gone longer than the resume window"""
+        now = time.monotonic()
+        for user_id, session in list(self.sessions.items()):
+            if session.is_expired(now):
+                del self.sessions[user_id]
+
+    async def _send_to_user(self, user_id: str, message: Union[dict, str]) -> bool:
+        """Sequence, buffer and send a message to one user; False if not delivered now"""
+        if isinstance(message, dict):
+            session = self.sessions.get(user_id)
+            if session is not None and not session.is_expired(time.monotonic()):
+                # Buffered even while offline so a RESUME can replay it
+                message = session.record(message)
+
+        writer = self.writers.get(user_id)
+        if writer is None:
+            return False
+        try:
+            await writer.send(message)
+            return True
+        except Exception as e:
+            self._handle_send_error(user_id, writer.websocket, e)
+            return False
+
+    async def send_control_message(self, message: dict, user_id: str) -> bool:
+        """Send an unsequenced protocol reply (pong, subscription acks) in the client's framing"""
+        writer = self.writers.get(user_id)
+        if writer is None:
+            return False
+        try:
+            await writer.send(message)
+            return True
+        except Exception as e:
+            self._handle_send_error(user_id, writer.websocket, e)
+            return False
+
+    def _handle_send_error(self, user_id: str, websocket: WebSocket, error: Exception):
+        logger.error(f"Failed to send message to user {user_id}: {str(error)}")
+        # Remove disconnected websocket
+        self.disconnect(user_id, websocket)
+
+    async def resume(self, user_id: str, last_seq: int) -> bool:
+        """Replay messages the client missed since last_seq after a reconnect"""
+        writer = self.writers.get(user_id)
+        if writer is None:
+            return False
+        session = self.sessions.get(user_id)
+        missed = session.replay_after(last_seq) if session else None
+        if missed is None:
+            # Gap is larger than the buffer; the client has to resync via REST
+            await writer.send({
+                "type": "RESUME_FAILED",
+                "last_seq": session.last_seq if session else 0
+            })
+            logger.info(f"User {user_id} could not resume from seq {last_seq}")
+            return False
+
+        missed = [message for message in missed if message["seq"] <= writer.start_seq]
+        for message in missed:
+            await writer.send(message)
+        await writer.send({
+            "type": "RESUMED",
+            "replayed": len(missed),
+            "last_seq": session.last_seq
+        })
+        logger.info(f"Replayed {len(missed)} messages to user {user_id} from seq {last_seq}")
+        return True
+
+    def subscribe(self, user_id: str, topic: str) -> bool:
+        """Subscribe a connected user to a topic"""
+        if user_id not in self.active_connections:
+            logger.warning(f"User {user_id} not connected - cannot subscribe to {topic}")
+            return False
+        self.topic_subscribers.setdefault(topic, set()).add(user_id)
+        self.user_topics.setdefault(user_id, set()).add(topic)
+        logger.info(f"User {user_id} subscribed to {topic}")
+        return True
+
+    def unsubscribe(self, user_id: str, topic: str):
+        """Remove a user's subscription to a topic"""
+        subscribers = self.topic_subscribers.get(topic)
+        if subscribers is not None:
+            subscribers.discard(user_id)
+            if not subscribers:
+                del self.topic_subscribers[topic]
+        topics = self.user_topics.get(user_id)
+        if topics is not None:
+            topics.discard(topic)
+            if not topics:
+                del self.user_topics[user_id]
+
+    def unsubscribe_all(self, user_id: str):
+        """Remove every subscription held by a user"""
+        for topic in list(self.user_topics.get(user_id, ())):
+            self.unsubscribe(user_id, topic)
+
+    def get_topic_subscribers(self, topic: str) -> List[str]:
+        """Get list of user IDs subscribed to a topic"""
+        return list(self.topic_subscribers.get(topic, ()))
 
     async def send_personal_message(self, message: dict, user_id: str) -> bool:
         """Send message to a specific user and return success status"""
-        if user_id in self.active_connections:
-            try:
-                websocket = self.active_connections[user_id]
-                # Handle both dict and string messages
-                if isinstance(message, dict):
-                    await websocket.send_text(json.dumps(message))
-                else:
-                    await websocket.send_text(message)
-                logger.info(f"Message sent to user {user_id}")
-                return True
-            except Exception as e:
-                logger.error(f"Failed to send message to user {user_id}: {str(e)}")
-                # Remove disconnected websocket
-                self.disconnect(user_id)
-                return False
-        else:
+        if user_id not in self.active_connections:
             logger.warning(f"User {user_id} not connected - cannot send message")
-            return False
+        if await self._send_to_user(user_id, message):
+            logger.info(f"Message sent to user {user_id}")
+            return True
+        return False
 
     async def deliver_pending_invites(self, user_id: str, db: Session):
         """Deliver all pending invites when user connects"""
@@ -89,28 +434,18 @@ class ConnectionManager:
     async def broadcast_to_others(self, sender_user_id: str, message: dict):
         """Broadcast message to all connected users except the sender"""
         sent_count = 0
-        for user_id, websocket in list(self.active_connections.items()):
+        for user_id in list(self.active_connections.keys()):
             if user_id != sender_user_id:  # Don't send to sender
-                try:
-                    await websocket.send_text(json.dumps(message))
+                if await self._send_to_user(user_id, message):
                     sent_count += 1
-                except Exception as e:
-                    logger.error(f"Failed to broadcast to user {user_id}: {str(e)}")
-                    # Remove disconnected websockets
-                    self.disconnect(user_id)
         logger.info(f"Broadcast sent to {sent_count} users (excluding sender {sender_user_id})")
 
     async def broadcast_to_all(self, message: dict):
         """Broadcast message to all connected users"""
         sent_count = 0
-        for user_id, websocket in list(self.active_connections.items()):
-            try:
-                await websocket.send_text(json.dumps(message))
+        for user_id in list(self.active_connections.keys()):
+            if await self._send_to_user(user_id, message):
                 sent_count += 1
-            except Exception as e:
-                logger.error(f"Failed to broadcast to user {user_id}: {str(e)}")
-                # Remove disconnected websockets
-                self.disconnect(user_id)
         logger.info(f"Broadcast sent to {sent_count} users")
 
     async def broadcast_to_battle(self, message: dict, user_ids: List[str]):
@@ -119,23 +454,38 @@ class ConnectionManager:
         logger.info(f"Message type: {message.get('type', 'unknown')}")
         sent_count = 0
         for user_id in user_ids:
-            if user_id in self.active_connections:
-                try:
-                    websocket = self.active_connections[user_id]
-                    # Handle both dict and string messages
-                    if isinstance(message, dict):
-                        await websocket.send_text(json.dumps(message))
-                    else:
-                        await websocket.send_text(message)
-                    sent_count += 1
-                    logger.info(f"Successfully sent message to user {user_id}")
-                except Exception as e:
-                    logger.error(f"Failed to send battle message to user {user_id}: {str(e)}")
-                    self.disconnect(user_id)
+            # Offline participants still get the message buffered for RESUME
+            if await self._send_to_user(user_id, message):
+                sent_count += 1
+                logger.info(f"Successfully sent message to user {user_id}")
             else:
                 logger.warning(f"Battle participant {user_id} not connected")
         logger.info(f"Battle message sent to {sent_count}/{len(user_ids)} participants")
 
+    async def broadcast_to_topics(self, topics: Iterable[str], message: dict, exclude_user_id: str = None):
+        """Send message once to every user subscribed to any of the given topics"""
+        topics = list(topics)
+        recipients = set()
+        for topic in topics:
+            recipients |= self.topic_subscribers.get(topic, set())
+        recipients.discard(exclude_user_id)
+
+        sent_count = 0
+        for user_id in list(recipients):
+            if user_id not in self.active_connections:
+                self.unsubscribe_all(user_id)
+                continue
+            if await self._send_to_user(user_id, message):
+                sent_count += 1
+        logger.info(f"Topic message sent to {sent_count} subscribers of {topics}")
+
+    def get_message_stats(self) -> dict:
+        """Outbound traffic counters, for spotting which message types dominate bandwidth"""
+        return {
+            "connections": len(self.active_connections),
+            **self.message_stats.snapshot()
+        }
+
     def get_connected_users(self) -> List[str]:
         """Get list of currently connected user IDs"""
         return list(self.active_connections.keys())
@@ -147,15 +497,16 @@ class ConnectionManager:
     async def cleanup_stale_connections(self):
         """Remove connections that are no longer active"""
         stale_connections = []
-        for user_id, websocket in self.active_connections.items():
+        for user_id, websocket in list(self.active_connections.items()):
             try:
                 # Try to ping the connection
                 await websocket.ping()
             except Exception:
-                stale_connections.append(user_id)
+                stale_connections.append((user_id, websocket))
         
-        for user_id in stale_connections:
-            self.disconnect(user_id)
+        for user_id, websocket in stale_connections:
+            self.disconnect(user_id, websocket)
+        self._prune_sessions()
         
         if stale_connections:
             logger.info(f"Cleaned up {len(stale_connections)} stale connections")
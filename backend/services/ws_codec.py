@@ -0,0 +1,121 @@
+import json
+import re
+import uuid
+from typing import Any, List, Optional
+
+try:
+    import msgpack
+except ImportError:  # Binary protocol is optional; JSON keeps working without it
+    msgpack = None
+
+# MessagePack ext type carrying a UUID as its 16 raw bytes
+UUID_EXT_TYPE = 1
+
+_UUID_PATTERN = re.compile(
+    r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$'
+)
+
+# Short integer tags for message "type" values. Append only: clients decode
+# by tag, so existing numbers must never change meaning.
+MESSAGE_TYPE_TAGS = {
+    "pong": 1,
+    "BATTLE_INVITATION": 2,
+    "BATTLE_ACCEPTED": 3,
+    "BATTLE_STARTED": 4,
+    "BATTLE_DECLINED": 5,
+    "PUBLIC_BATTLE_CREATED": 6,
+    "opponent_answered": 7,
+    "question_completed": 8,
+    "battle_completed": 9,
+    "SUBSCRIBED": 10,
+    "UNSUBSCRIBED": 11,
+    "RESUMED": 12,
+    "RESUME_FAILED": 13,
+}
+MESSAGE_TYPES_BY_TAG = {tag: name for name, tag in MESSAGE_TYPE_TAGS.items()}
+
+
+def is_binary_available() -> bool:
+    """Whether the msgpack dependency is installed"""
+    return msgpack is not None
+
+
+def _compact(value: Any) -> Any:
+    """Replace UUID strings with ext values, recursively"""
+    if isinstance(value, str):
+        if len(value) == 36 and _UUID_PATTERN.match(value):
+            return msgpack.ExtType(UUID_EXT_TYPE, uuid.UUID(value).bytes)
+        return value
+    if isinstance(value, dict):
+        return {key: _compact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_compact(item) for item in value]
+    return value
+
+
+def _tag_message(message: dict) -> dict:
+    compacted = _compact(message)
+    message_type = message.get("type")
+    if message_type in MESSAGE_TYPE_TAGS:
+        compacted["type"] = MESSAGE_TYPE_TAGS[message_type]
+    return compacted
+
+
+def _ext_hook(code: int, data: bytes) -> Any:
+    if code == UUID_EXT_TYPE:
+        return str(uuid.UUID(bytes=data))
+    return msgpack.ExtType(code, data)
+
+
+def _untag_message(message: Any) -> Any:
+    if isinstance(message, dict) and isinstance(message.get("type"), int):
+        message["type"] = MESSAGE_TYPES_BY_TAG.get(message["type"], message["type"])
+    return message
+
+
+def encode_binary(payload: Any) -> bytes:
+    """Encode a message, or a list of messages, for the msgpack subprotocol"""
+    if isinstance(payload, list):
+        packed = [_tag_message(message) for message in payload]
+    else:
+        packed = _tag_message(payload)
+    return msgpack.packb(packed, use_bin_type=True)
+
+
+def encode_binary_batch(encoded_messages: List[bytes]) -> bytes:
+    """Join individually encoded messages into one msgpack array frame"""
+    return msgpack.Packer().pack_array_header(len(encoded_messages)) + b"".join(encoded_messages)
+
+
+def decode_binary(data: bytes) -> Any:
+    """Decode a msgpack frame back into the JSON-equivalent message(s)"""
+    payload = msgpack.unpackb(data, raw=False, ext_hook=_ext_hook)
+    if isinstance(payload, list):
+        return [_untag_message(message) for message in payload]
+    return _untag_message(payload)
+
+
+class InvalidFrame(ValueError):
+    """A client frame that doesn't decode to a single message object"""
+
+
+def decode_client_frame(frame: dict) -> Optional[dict]:
+    """Decode an incoming ASGI websocket.receive frame, text or binary"""
+    if frame.get("text") is not None:
+        try:
+            message = json.loads(frame["text"])
+        except ValueError as e:
+            raise InvalidFrame(f"Malformed JSON: {e}")
+    elif frame.get("bytes") is not None:
+        if msgpack is None:
+            raise InvalidFrame("Binary frames require msgpack")
+        try:
+            message = decode_binary(frame["bytes"])
+        except Exception as e:
+            raise InvalidFrame(f"Malformed msgpack: {e or type(e).__name__}")
+    else:
+        return None
+    # Arrays and scalars decode fine but aren't messages the handlers can read
+    if not isinstance(message, dict):
+        raise InvalidFrame("A frame must hold one message object")
+    return message
@@ -0,0 +1,43 @@
+import os
+import sys
+import uuid
+
+# The suite always runs against the in-memory SQLite profile, never a
+# DATABASE_URL left in the shell or .env; set it before anything imports database
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+os.environ.pop("DATABASE_READ_REPLICA_URL", None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from database import Base, engine
+import models  # noqa: F401  Registers every table on Base.metadata
+
+
+@pytest.fixture(scope="session", autouse=True)
+def tables():
+    """Create the schema once in the shared in-memory database"""
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def db():
+    from database import SessionLocal
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def user(db):
+    """A throwaway user; tests share one database, so names are unique"""
+    from models import User
+    suffix = uuid.uuid4().hex[:12]
+    user = User(username=f"user_{suffix}", email=f"{suffix}@example.com", password_hash="x")
+    db.add(user)
+    db.commit()
+    return user
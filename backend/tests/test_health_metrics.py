@@ -0,0 +1,31 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture
+def client():
+    # Without the context manager startup hooks don't run, so no worker pools start
+    return TestClient(main.app)
+
+
+def test_metrics_disabled_without_token(client, monkeypatch):
+    monkeypatch.setattr(main, "HEALTH_METRICS_TOKEN", "")
+    assert client.get("/health/metrics").status_code == 404
+    assert client.get("/health/metrics", headers={"Authorization": "Bearer anything"}).status_code == 404
+
+
+def test_metrics_require_the_token(client, monkeypatch):
+    monkeypatch.setattr(main, "HEALTH_METRICS_TOKEN", "s3cret")
+    assert client.get("/health/metrics").status_code == 401
+    assert client.get("/health/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+    response = client.get("/health/metrics", headers={"Authorization": "Bearer s3cret"})
+    assert response.status_code == 200
+    assert {"websockets", "db_pool", "auth_cache", "upload_jobs"} <= response.json().keys()
+
+
+def test_per_subsystem_routes_are_gone(client):
+    assert client.get("/health/executor").status_code == 404
+    assert client.get("/health").status_code == 200
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from models import ClassFolder, TempNote
+from services.note_reaper import NoteReaper
+
+
+@pytest.fixture
+def folder(db, user):
+    folder = ClassFolder(owner_id=user.id, name="Reaper folder")
+    db.add(folder)
+    db.commit()
+    return folder
+
+
+def add_notes(db, user, folder, count, expires_at):
+    notes = [
+        TempNote(user_id=user.id, class_folder_id=folder.id, file_name=f"note{index}.txt", content="text", expires_at=expires_at)
+        for index in range(count)
+    ]
+    db.add_all(notes)
+    db.commit()
+    return notes
+
+
+async def test_run_once_deletes_only_expired_notes(db, user, folder):
+    now = datetime.now(timezone.utc)
+    add_notes(db, user, folder, 5, now - timedelta(minutes=1))
+    kept = add_notes(db, user, folder, 2, now + timedelta(hours=1))
+
+    reaper = NoteReaper(interval_seconds=60, batch_size=2)
+    assert await reaper.run_once() == 5
+
+    remaining = db.query(TempNote).filter(TempNote.class_folder_id == folder.id).all()
+    assert {note.id for note in remaining} == {note.id for note in kept}
+    metrics = reaper.get_metrics()
+    # 2 + 2 + 1: the short batch ends the run
+    assert (metrics["runs"], metrics["total_deleted"], metrics["total_batches"]) == (1, 5, 3)
+    assert metrics["last_error"] is None
+
+
+async def test_run_once_with_nothing_expired(db, user, folder):
+    reaper = NoteReaper(interval_seconds=60, batch_size=10)
+    assert await reaper.run_once() == 0
+    assert reaper.get_metrics()["total_batches"] == 1
+
+
+async def test_start_and_stop():
+    reaper = NoteReaper(interval_seconds=3600)
+    reaper.start()
+    assert reaper.get_metrics()["running"]
+    await reaper.stop()
+    assert not reaper.get_metrics()["running"]
@@ -0,0 +1,46 @@
+import base64
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from services.pagination import decode_cursor, decode_rank_cursor, encode_cursor, encode_rank_cursor, split_page
+
+
+def test_cursor_roundtrip():
+    created_at = datetime(2026, 10, 19, 11, 40, 2, 118734, tzinfo=timezone.utc)
+    row_id = uuid.uuid4()
+    cursor = encode_cursor(created_at, row_id)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, row_id)
+
+
+def test_rank_cursor_roundtrip():
+    row_id = uuid.uuid4()
+    assert decode_rank_cursor(encode_rank_cursor(0.25, row_id)) == (0.25, row_id)
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor",
+    base64.urlsafe_b64encode(b"[1, 2, 3]").decode(),
+    base64.urlsafe_b64encode(b'["yesterday", "x"]').decode(),
+    base64.urlsafe_b64encode(b'["2026-10-19T11:40:02", "not-a-uuid"]').decode(),
+])
+def test_malformed_cursor_is_400(cursor):
+    with pytest.raises(HTTPException) as excinfo:
+        decode_cursor(cursor)
+    assert excinfo.value.status_code == 400
+
+
+def test_split_page_cursor_points_at_last_row():
+    class Row:
+        def __init__(self, index):
+            self.created_at = datetime(2026, 10, 19, tzinfo=timezone.utc)
+            self.id = uuid.UUID(int=index)
+
+    rows = [Row(index) for index in range(3, 0, -1)]
+    page, next_cursor = split_page(rows, 2)
+    assert page == rows[:2]
+    assert decode_cursor(next_cursor) == (rows[1].created_at, rows[1].id)
+    assert split_page(rows, 3) == (rows, None)
@@ -0,0 +1,57 @@
+import time
+
+from services.principal_cache import Principal, PrincipalCache, principal_cache
+
+
+def cache_token(cache, user):
+    exp = int(time.time()) + 3600
+    cache.put(str(user.id), exp, Principal.from_user(user))
+    return exp
+
+
+def test_invalidate_drops_every_token_for_the_user(user):
+    cache = PrincipalCache(ttl_seconds=60)
+    first = cache_token(cache, user)
+    second = first + 1
+    cache.put(str(user.id), second, Principal.from_user(user))
+    cache.invalidate(user.id)
+    assert cache.get(str(user.id), first) is None
+    assert cache.get(str(user.id), second) is None
+    assert cache.get_metrics()["users"] == 0
+
+
+def test_expired_tokens_are_never_cached(user):
+    cache = PrincipalCache(ttl_seconds=60)
+    cache.put(str(user.id), int(time.time()) - 1, Principal.from_user(user))
+    assert cache.get_metrics()["entries"] == 0
+
+
+def test_lru_eviction(user):
+    cache = PrincipalCache(ttl_seconds=60, max_entries=2)
+    exp = int(time.time()) + 3600
+    for offset in range(3):
+        cache.put(str(user.id), exp + offset, Principal.from_user(user))
+    assert cache.get(str(user.id), exp) is None
+    assert cache.get(str(user.id), exp + 2) is not None
+    assert cache.evictions == 1
+
+
+def test_identity_change_invalidates(db, user):
+    exp = cache_token(principal_cache, user)
+    user.username = f"{user.username}_renamed"
+    db.commit()
+    assert principal_cache.get(str(user.id), exp) is None
+
+
+def test_stats_change_keeps_cached_principal(db, user):
+    exp = cache_token(principal_cache, user)
+    user.total_points = 100
+    db.commit()
+    assert principal_cache.get(str(user.id), exp) is not None
+
+
+def test_delete_invalidates(db, user):
+    exp = cache_token(principal_cache, user)
+    db.delete(user)
+    db.commit()
+    assert principal_cache.get(str(user.id), exp) is None
@@ -0,0 +1,76 @@
+"""The hot-path queries are served by their indexes on the SQLite profile"""
+
+import uuid
+
+import pytest
+from sqlalchemy import text
+
+from database import engine
+
+# (description, SQL, index expected in the plan). Where several indexes lead
+# with the same column the planner may pick any of them on small tables, so
+# a tuple lists every acceptable index, the intended one first.
+HOT_QUERIES = [
+    ("My battles as challenger",
+     "SELECT * FROM battles WHERE challenger_id = :user_id AND battle_status = 'completed'",
+     "ix_battles_challenger_status"),
+    ("My battles as opponent",
+     "SELECT * FROM battles WHERE opponent_id = :user_id AND battle_status = 'completed'",
+     "ix_battles_opponent_status"),
+    ("Pending invitations",
+     "SELECT * FROM battles WHERE opponent_id = :user_id AND battle_status = 'pending'",
+     ("ix_battles_pending_opponent", "ix_battles_opponent_status", "ix_battles_opponent_created")),
+    ("Battle responses per player",
+     "SELECT * FROM battle_responses WHERE battle_id = :battle_id AND user_id = :user_id",
+     "ix_battle_responses_battle_user"),
+    ("Dashboard responses",
+     "SELECT * FROM battle_responses WHERE user_id = :user_id",
+     "ix_battle_responses_user"),
+    ("Folder questions by difficulty",
+     "SELECT * FROM questions WHERE class_folder_id = :folder_id AND difficulty_level = 'medium' AND question_type = 'multiple_choice'",
+     ("ix_questions_folder_difficulty_type", "ix_questions_folder_created")),
+    ("Folder notes",
+     "SELECT * FROM temp_notes WHERE class_folder_id = :folder_id",
+     "ix_temp_notes_class_folder"),
+    ("Expired notes cleanup",
+     "DELETE FROM temp_notes WHERE id IN (SELECT id FROM temp_notes WHERE expires_at < CURRENT_TIMESTAMP ORDER BY expires_at LIMIT 500)",
+     "ix_temp_notes_expires_at"),
+    ("Public folders, newest first",
+     "SELECT * FROM class_folders WHERE is_public ORDER BY created_at DESC, id DESC LIMIT 20",
+     "ix_class_folders_public_created"),
+    ("My folders",
+     "SELECT * FROM class_folders WHERE owner_id = :user_id",
+     ("unique_user_folder_name", "ix_class_folders_owner_created", "sqlite_autoindex_class_folders")),
+    ("My folders page",
+     "SELECT * FROM class_folders WHERE owner_id = :user_id AND (created_at, id) < (CURRENT_TIMESTAMP, :folder_id) ORDER BY created_at DESC, id DESC LIMIT 51",
+     "ix_class_folders_owner_created"),
+    ("Battle history page, challenger side",
+     "SELECT id, created_at FROM battles WHERE challenger_id = :user_id AND (created_at, id) < (CURRENT_TIMESTAMP, :battle_id) ORDER BY created_at DESC, id DESC LIMIT 51",
+     "ix_battles_challenger_created"),
+    ("Battle history page, opponent side",
+     "SELECT id, created_at FROM battles WHERE opponent_id = :user_id AND (created_at, id) < (CURRENT_TIMESTAMP, :battle_id) ORDER BY created_at DESC, id DESC LIMIT 51",
+     "ix_battles_opponent_created"),
+    ("Folder questions page",
+     "SELECT * FROM questions WHERE class_folder_id = :folder_id AND (created_at, id) < (CURRENT_TIMESTAMP, :battle_id) ORDER BY created_at DESC, id DESC LIMIT 51",
+     "ix_questions_folder_created"),
+]
+
+
+def explain(sql: str) -> str:
+    """Return the plan for sql as text that mentions the indexes it uses"""
+    params = {"user_id": uuid.uuid4().hex, "battle_id": uuid.uuid4().hex, "folder_id": uuid.uuid4().hex}
+    with engine.connect() as connection:
+        rows = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params).fetchall()
+    return "\n".join(str(row[-1]) for row in rows)
+
+
+@pytest.mark.parametrize(
+    "sql, index_names",
+    [(sql, index_names) for _, sql, index_names in HOT_QUERIES],
+    ids=[description for description, _, _ in HOT_QUERIES],
+)
+def test_query_uses_index(sql, index_names):
+    if isinstance(index_names, str):
+        index_names = (index_names,)
+    plan = explain(sql)
+    assert any(name in plan for name in index_names), f"expected {' or '.join(index_names)}, got:\n{plan}"
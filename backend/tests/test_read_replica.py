@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import database
+
+
+@pytest.fixture
+async def dead_replica(monkeypatch, tmp_path):
+    """A replica whose database file can't be opened"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/missing/replica.db")
+    monkeypatch.setattr(database, "ReadAsyncSessionLocal", async_sessionmaker(bind=engine, class_=AsyncSession))
+    monkeypatch.setattr(database, "_replica_unavailable_until", 0.0)
+    yield engine
+    await engine.dispose()
+
+
+async def read_session_engine():
+    sessions = database.get_read_db()
+    db = await sessions.__anext__()
+    try:
+        return db.bind
+    finally:
+        await sessions.aclose()
+
+
+async def test_reads_use_primary_without_replica():
+    assert database.ReadAsyncSessionLocal is None
+    assert await read_session_engine() is database.async_engine
+
+
+async def test_dead_replica_falls_back_to_primary(dead_replica, monkeypatch):
+    assert await read_session_engine() is database.async_engine
+    assert database._replica_unavailable_until > 0
+
+    # Within the retry window the replica isn't tried again
+    def fail():
+        raise AssertionError("replica retried inside the retry window")
+    monkeypatch.setattr(database, "ReadAsyncSessionLocal", fail)
+    assert await read_session_engine() is database.async_engine
+
+
+async def test_live_replica_serves_reads(monkeypatch, tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/replica.db")
+    monkeypatch.setattr(database, "ReadAsyncSessionLocal", async_sessionmaker(bind=engine, class_=AsyncSession))
+    monkeypatch.setattr(database, "_replica_unavailable_until", 0.0)
+    try:
+        assert await read_session_engine() is engine
+    finally:
+        await engine.dispose()
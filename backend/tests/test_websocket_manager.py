@@ -0,0 +1,54 @@
+import pytest
+
+from services.websocket_manager import ReplaySession, folder_topic, normalize_topic, university_topic
+
+
+def test_replay_after_returns_newer_messages():
+    session = ReplaySession(buffer_size=4)
+    for index in range(3):
+        session.record({"type": "pong", "index": index})
+    assert [message["seq"] for message in session.replay_after(1)] == [2, 3]
+
+
+def test_replay_after_up_to_date_is_empty():
+    session = ReplaySession()
+    session.record({"type": "pong"})
+    assert session.replay_after(1) == []
+    assert ReplaySession().replay_after(0) == []
+
+
+def test_replay_after_evicted_or_unknown_seq_fails():
+    session = ReplaySession(buffer_size=2)
+    for _ in range(5):
+        session.record({"type": "pong"})
+    # Seq 3 was evicted, so the client can't be brought up to date
+    assert session.replay_after(2) is None
+    assert [message["seq"] for message in session.replay_after(3)] == [4, 5]
+    # A seq this session never issued means it is not the session the client knew
+    assert session.replay_after(6) is None
+
+
+def test_record_stamps_a_copy():
+    message = {"type": "pong"}
+    stamped = ReplaySession().record(message)
+    assert stamped == {"type": "pong", "seq": 1}
+    assert "seq" not in message
+
+
+@pytest.mark.parametrize("topic, expected", [
+    ("lobby", "lobby"),
+    ("folder:3f1c", "folder:3f1c"),
+    ("university:mit", "university:mit"),
+    ("university: MIT ", "university:mit"),
+    ("folder:", None),
+    ("university:  ", None),
+    ("admin", None),
+    ("Lobby", None),
+])
+def test_normalize_topic(topic, expected):
+    assert normalize_topic(topic) == expected
+
+
+def test_topic_builders_match_normalized_names():
+    assert normalize_topic(university_topic("Harvard University")) == university_topic("Harvard University")
+    assert normalize_topic(folder_topic("abc")) == "folder:abc"
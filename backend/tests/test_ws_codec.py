@@ -0,0 +1,48 @@
+import json
+import uuid
+
+import pytest
+
+from services.ws_codec import InvalidFrame, decode_binary, decode_client_frame, encode_binary, encode_binary_batch
+
+msgpack = pytest.importorskip("msgpack")
+
+
+def test_binary_roundtrip():
+    message = {
+        "type": "BATTLE_INVITATION",
+        "battle_id": str(uuid.uuid4()),
+        "scores": [1, 2.5, None],
+        "nested": {"user_id": str(uuid.uuid4()), "name": "Ada"},
+        "type_unknown_to_tags": "kept",
+    }
+    encoded = encode_binary(message)
+    # Tagged type and 16-byte UUIDs make the frame smaller than the JSON
+    assert len(encoded) < len(json.dumps(message))
+    assert decode_binary(encoded) == message
+
+
+def test_binary_batch_roundtrip():
+    messages = [{"type": "pong"}, {"type": "custom", "id": str(uuid.uuid4())}]
+    assert decode_binary(encode_binary(messages)) == messages
+    batch = encode_binary_batch([encode_binary(message) for message in messages])
+    assert decode_binary(batch) == messages
+
+
+def test_decode_client_frame():
+    assert decode_client_frame({"text": '{"type": "ping"}'}) == {"type": "ping"}
+    assert decode_client_frame({"bytes": encode_binary({"type": "ping"})}) == {"type": "ping"}
+    assert decode_client_frame({}) is None
+
+
+@pytest.mark.parametrize("frame", [
+    {"text": "{not json"},
+    {"text": "[1, 2]"},
+    {"text": "42"},
+    {"bytes": msgpack.packb([{"type": "ping"}])},
+    {"bytes": msgpack.packb(7)},
+    {"bytes": b"\xc1"},
+])
+def test_decode_client_frame_rejects_non_messages(frame):
+    with pytest.raises(InvalidFrame):
+        decode_client_frame(frame)
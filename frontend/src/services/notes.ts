@@ -4,12 +4,18 @@ import {
   GenerateQuestionsResponse, 
   CleanupResponse, 
   UploadProgress,
+  UploadJob,
   ValidationResult 
 } from '../types/notes'
 import { api} from './auth' // Import the configured axios instance
 
 // Create axios instance for notes API
 
+// How often an upload job's status is polled while its files are extracted
+const UPLOAD_JOB_POLL_INTERVAL_MS = 1000
+
+const sleep = (ms: number) => new Promise(resolve => setTimeout(resolve, ms))
+
 
 export const notesService = {
   // Upload notes to a class folder
@@ -31,19 +37,20 @@ export const notesService = {
         status: 'pending'
       }))
 
-      const response = await api.post(`/notes/upload/${folderId}`, formData, {
+      const response = await api.post<UploadJob>(`/notes/upload/${folderId}`, formData, {
         headers: {
           'Content-Type': 'multipart/form-data',
         },
         onUploadProgress: (progressEvent) => {
           if (progressEvent.total && onProgress) {
+            // Sending the bytes is the first half; extraction on the server is the rest
             const percentCompleted = Math.round(
-              (progressEvent.loaded * 100) / progressEvent.total
+              (progressEvent.loaded * 50) / progressEvent.total
             )
             
             progressArray.forEach(item => {
               item.progress = percentCompleted
-              item.status = percentCompleted === 100 ? 'completed' : 'uploading'
+              item.status = 'uploading'
             })
             
             onProgress([...progressArray])
@@ -51,6 +58,40 @@ export const notesService = {
         }
       })
 
+      // The server accepted the files (202); poll the job until extraction finishes
+      let job = response.data
+      while (job.status !== 'completed' && job.status !== 'failed') {
+        await sleep(UPLOAD_JOB_POLL_INTERVAL_MS)
+        job = (await api.get<UploadJob>(`/notes/jobs/${job.job_id}`)).data
+
+        if (onProgress) {
+          job.files.forEach((jobFile, index) => {
+            const item = progressArray[index]
+            if (!item) return
+            if (jobFile.status === 'completed') {
+              item.progress = 100
+            } else if (jobFile.status === 'processing' && jobFile.pages_total) {
+              item.progress = 50 + Math.round((jobFile.pages_done * 50) / jobFile.pages_total)
+            }
+          })
+          onProgress([...progressArray])
+        }
+      }
+
+      if (job.status === 'failed' || !job.result) {
+        if (onProgress) {
+          job.files.forEach((jobFile, index) => {
+            const item = progressArray[index]
+            if (item && jobFile.status !== 'completed') {
+              item.status = 'error'
+              item.error = jobFile.error ?? undefined
+            }
+          })
+          onProgress([...progressArray])
+        }
+        throw new Error(job.error || 'Failed to process notes')
+      }
+
       // Mark all files as completed
       if (onProgress) {
         progressArray.forEach(item => {
@@ -60,8 +101,11 @@ export const notesService = {
         onProgress([...progressArray])
       }
 
-      return response.data
+      return job.result
     } catch (error) {
+      if (!(error instanceof AxiosError)) {
+        throw error
+      }
       const axiosError = error as AxiosError<{ detail?: string; message?: string }>
       
       // Handle specific error cases
@@ -11,6 +11,31 @@ export interface GenerateQuestionsResponse {
   generated_at: string
 }
 
+// Background extraction job returned by POST /notes/upload/{folderId}
+export type UploadJobStatus = 'queued' | 'processing' | 'completed' | 'failed'
+
+export interface UploadJobFile {
+  filename: string
+  type: string
+  size: number
+  status: UploadJobStatus
+  pages_done: number
+  pages_total: number | null
+  error: string | null
+}
+
+export interface UploadJob {
+  job_id: string
+  folder_id: string
+  status: UploadJobStatus
+  files: UploadJobFile[]
+  error: string | null
+  result: UploadResponse | null
+  created_at: string
+  started_at: string | null
+  finished_at: string | null
+}
+
 export interface CleanupResponse {
   message: string
   deleted_count: number